@@ -99,7 +99,7 @@ show_help() {
     echo -e "  ${GREEN}db-pull${NC} [локальный-путь] [удалённый-путь]"
     echo -e "                         Скопировать БД с Fly.io на локальный компьютер"
     echo -e "  ${GREEN}db-push${NC} [локальный-путь] [удалённый-путь]"
-    echo -e "                         Загрузить локальную БД на Fly.io"
+    echo -e "                         Загрузить локальную БД на Fly.io (с перезапуском приложения)"
     echo -e "  ${GREEN}help${NC}                 Показать эту справку"
     echo ""
     echo -e "${YELLOW}Опции для test:${NC}"
@@ -120,14 +120,26 @@ show_help() {
     echo ""
 }
 
+# Python-однострочник для согласованного снимка SQLite-БД в WAL-режиме.
+# sqlite3.backup забирает и данные из -wal, а journal_mode=DELETE делает
+# снимок самодостаточным файлом без -wal/-shm.
+SQLITE_SNAPSHOT_PY='import sqlite3, sys; s = sqlite3.connect(sys.argv[1]); d = sqlite3.connect(sys.argv[2]); s.backup(d); d.execute("PRAGMA journal_mode=DELETE"); d.close(); s.close()'
+
+# Создать снимок БД на сервере Fly.io
+snapshot_remote_db() {
+    local app_name="$1" source_path="$2" target_path="$3"
+    fly ssh console -a "$app_name" -C "python -c '${SQLITE_SNAPSHOT_PY}' \"$source_path\" \"$target_path\""
+}
+
 # Скопировать БД из Fly.io на локальный компьютер
 pull_db_from_fly() {
     require_flyctl
 
-    local app_name remote_path local_path backup_dir backup_path
+    local app_name remote_path local_path backup_dir backup_path snapshot_path
     app_name=$(get_fly_app)
     local_path="${1:-data/volleybot.db}"
     remote_path="${2:-$DEFAULT_REMOTE_DB_PATH}"
+    snapshot_path="${remote_path}.pull"
 
     mkdir -p "$(dirname "$local_path")"
 
@@ -144,10 +156,15 @@ pull_db_from_fly() {
         mkdir -p "$backup_dir"
         backup_path="${backup_dir}/$(basename "$local_path").$(date +%Y%m%d_%H%M%S).bak"
         mv "$local_path" "$backup_path"
+        rm -f "${local_path}-wal" "${local_path}-shm"
         echo -e "${YELLOW}Текущая локальная БД перенесена в бэкап: ${backup_path}${NC}"
     fi
 
-    FLY_NO_UPDATE_CHECK=1 fly ssh sftp get "$remote_path" "$local_path" -a "$app_name"
+    # БД работает в WAL-режиме: свежие коммиты лежат в volleybot.db-wal,
+    # поэтому копируем не сам файл, а согласованный снимок.
+    snapshot_remote_db "$app_name" "$remote_path" "$snapshot_path"
+    FLY_NO_UPDATE_CHECK=1 fly ssh sftp get "$snapshot_path" "$local_path" -a "$app_name"
+    fly ssh console -a "$app_name" -C "rm -f \"$snapshot_path\""
 
     echo ""
     echo -e "${GREEN}✓ БД скачана в ${local_path}${NC}"
@@ -157,10 +174,11 @@ pull_db_from_fly() {
 push_db_to_fly() {
     require_flyctl
 
-    local app_name remote_path local_path remote_backup_path
+    local app_name remote_path local_path remote_backup_path upload_path python_bin
     app_name=$(get_fly_app)
     local_path="${1:-data/volleybot.db}"
     remote_path="${2:-$DEFAULT_REMOTE_DB_PATH}"
+    upload_path="${remote_path}.upload"
 
     echo -e "${CYAN}========================================${NC}"
     echo -e "${CYAN}  Загрузка БД на Fly.io${NC}"
@@ -175,11 +193,24 @@ push_db_to_fly() {
         exit 1
     fi
 
+    # Переносим содержимое локального -wal в основной файл, чтобы загрузить
+    # самодостаточную БД (бот сам включит WAL при старте).
+    python_bin=$(command -v python3 || command -v python)
+    "$python_bin" -c 'import sqlite3, sys; c = sqlite3.connect(sys.argv[1]); c.execute("PRAGMA journal_mode=DELETE"); c.close()' "$local_path"
+
+    FLY_NO_UPDATE_CHECK=1 fly ssh sftp put "$local_path" "$upload_path" -a "$app_name"
+
     remote_backup_path="${remote_path}.$(date +%Y%m%d_%H%M%S).bak"
-    fly ssh console -a "$app_name" -C "sh -lc 'if [ -f \"$remote_path\" ]; then cp \"$remote_path\" \"$remote_backup_path\" && rm -f \"$remote_path\"; fi'"
-    echo -e "${YELLOW}Резервная копия на сервере (если файл существовал): ${remote_backup_path}${NC}"
+    fly ssh console -a "$app_name" -C "test -f \"$remote_path\"" \
+        && snapshot_remote_db "$app_name" "$remote_path" "$remote_backup_path" \
+        && echo -e "${YELLOW}Резервная копия на сервере: ${remote_backup_path}${NC}"
+
+    # Заменяем файл и удаляем -wal/-shm старой БД: они не соответствуют новому файлу
+    fly ssh console -a "$app_name" -C "sh -lc 'mv -f \"$upload_path\" \"$remote_path\" && rm -f \"$remote_path-wal\" \"$remote_path-shm\"'"
 
-    FLY_NO_UPDATE_CHECK=1 fly ssh sftp put "$local_path" "$remote_path" -a "$app_name"
+    # Бот держит открытое соединение со старой БД — перезапускаем приложение
+    echo -e "${YELLOW}Перезапуск приложения, чтобы бот открыл новую БД...${NC}"
+    fly apps restart "$app_name"
 
     echo ""
     echo -e "${GREEN}✓ БД загружена на Fly.io: ${remote_path}${NC}"
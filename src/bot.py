@@ -166,6 +166,7 @@ async def on_startup(
                     "message",  # Обычные текстовые сообщения и команды
                     "callback_query",  # Нажатия на inline кнопки (КРИТИЧНО!)
                     "poll_answer",  # Ответы пользователей на опросы
+                    "chat_member",  # Смена прав участников (сброс кэша админов)
                 ]
 
                 if WEBHOOK_SECRET:
@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+import atexit
 import json
 import logging
 import os
 import sqlite3
+import threading
+import time
 import typing
 from collections import defaultdict
 from contextlib import contextmanager
@@ -20,16 +23,55 @@ from .utils import normalize_telegram_username
 BOT_STATE_KEY = "bot_state"
 POLL_STATE_KEY = "poll_state"
 FUND_BALANCE_KEY = "fund_balance"
-SCHEMA_VERSION = 9
+SCHEMA_VERSION = 12
 BACKUP_RETENTION_DAYS = 10
 
+# SQL горячих путей kv_store/players. Один и тот же объект строки на каждый
+# вызов гарантирует попадание в кэш подготовленных выражений sqlite3.
+_STATEMENT_CACHE_SIZE = 256
+# Лимит memory-mapped I/O: файл БД бота целиком помещается в это окно
+_MMAP_SIZE = 256 * 1024 * 1024
+# kv_store не участвует во внешних ключах, поэтому REPLACE (delete+insert)
+# безопасен и проще UPSERT. updated_at заполняется DEFAULT вставляемой строки.
+_SQL_SAVE_STATE = "INSERT OR REPLACE INTO kv_store(key, value) VALUES (?, ?)"
+_SQL_LOAD_STATE = "SELECT value FROM kv_store WHERE key = ?"
+_SQL_GET_PLAYER_BALANCE = (
+    "SELECT id, name, fullname, balance FROM players WHERE id = ?"
+)
+_SQL_GET_PLAYER_INFO = (
+    "SELECT id, name, fullname, ball_donate, is_guest, balance "
+    "FROM players WHERE id = ?"
+)
+_SQL_ADD_PLAYER_BALANCE = "UPDATE players SET balance = balance + ? WHERE id = ?"
+_SQL_ADD_PLAYER_BALANCE_RETURNING = (
+    _SQL_ADD_PLAYER_BALANCE + " RETURNING id, name, fullname, balance"
+)
+_SQL_ENSURE_PLAYER = """
+    INSERT INTO players (id, name, fullname)
+    VALUES (?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = COALESCE(excluded.name, players.name),
+        fullname = COALESCE(players.fullname, excluded.fullname),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE players.name IS NOT COALESCE(excluded.name, players.name)
+       OR (players.fullname IS NULL AND excluded.fullname IS NOT NULL)
+    RETURNING id, name, fullname, ball_donate, is_guest, balance
+"""
+
+
+# Путь по умолчанию вычисляется один раз при импорте модуля
+_DEFAULT_DB_PATH: typing.Final[str] = str(
+    Path(__file__).parent.parent / "data" / "volleybot.db"
+)
+
 
 def _get_db_path() -> str:
-    """Возвращает путь к базе данных с учётом переменной окружения."""
-    override: str | None = os.getenv("VOLLEYBOT_DB_PATH")
-    if override:
-        return override
-    return str(Path(__file__).parent.parent / "data" / "volleybot.db")
+    """Возвращает путь к базе данных с учётом переменной окружения.
+
+    Переменная окружения читается на каждом вызове, чтобы тесты могли
+    подменять VOLLEYBOT_DB_PATH без перезагрузки модуля.
+    """
+    return os.environ.get("VOLLEYBOT_DB_PATH") or _DEFAULT_DB_PATH
 
 
 def _get_backup_dir(db_path: str | None = None) -> Path | None:
@@ -72,13 +114,15 @@ def create_backup(reason: str) -> Path | None:
         dest_conn = sqlite3.connect(str(backup_path))
         try:
             source_conn.backup(dest_conn)
+            # Бэкап должен быть самодостаточным файлом без -wal/-shm
+            dest_conn.execute("PRAGMA journal_mode = DELETE")
         finally:
             dest_conn.close()
             source_conn.close()
-        logging.info(f"🗄️ Создан бэкап БД: {backup_path}")
+        logging.info("🗄️ Создан бэкап БД: %s", backup_path)
         return backup_path
     except sqlite3.Error:
-        logging.exception(f"❌ Не удалось создать бэкап БД для события '{reason}'")
+        logging.exception("❌ Не удалось создать бэкап БД для события '%s'", reason)
         try:
             backup_path.unlink(missing_ok=True)
         except OSError:
@@ -106,30 +150,56 @@ def cleanup_old_backups(
                 path.unlink()
                 deleted += 1
         except OSError:
-            logging.exception(f"❌ Не удалось обработать файл бэкапа: {path}")
+            logging.exception("❌ Не удалось обработать файл бэкапа: %s", path)
 
     if deleted:
         logging.info(
-            f"🧹 Удалены старые бэкапы: {deleted} шт. старше {retention_days} дней"
+            "🧹 Удалены старые бэкапы: %s шт. старше %s дней", deleted, retention_days
         )
     return deleted
 
 
+# Путь БД, для которой схема уже создана/проверена в этом процессе
+_initialized_db_path: str | None = None
+_init_lock = threading.Lock()
+
+
+def _ensure_db_initialized() -> None:
+    """Вызывает init_db() только при первом обращении к текущей БД."""
+    if _initialized_db_path == _get_db_path():
+        return
+    with _init_lock:
+        if _initialized_db_path != _get_db_path():
+            init_db()
+
+
 def init_db() -> None:
     """Создаёт или строго валидирует актуальную схему БД."""
+    global _initialized_db_path
     db_path: str = _get_db_path()
-    logging.debug(f"Инициализация базы данных: {db_path}")
+    logging.debug("Инициализация базы данных: %s", db_path)
 
     # Для in-memory соединения каталоги не нужны
     if db_path != ":memory:":
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
     with _connect() as conn:
-        _create_base_tables(conn)
-        _ensure_base_schema(conn)
-        _ensure_current_schema(conn)
-        conn.commit()
-    logging.debug(f"✅ База данных инициализирована: {db_path}")
+        if db_path != ":memory:":
+            # WAL хранится в файле БД, поэтому достаточно включить его один раз
+            conn.execute("PRAGMA journal_mode = WAL")
+        # user_version выставляется только после успешной миграции и строгой
+        # проверки, поэтому для актуальной БД проверки table_info не нужны
+        user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if user_version != SCHEMA_VERSION:
+            _create_base_tables(conn)
+            _ensure_base_schema(conn)
+            _ensure_current_schema(conn)
+            conn.commit()
+            # После изменений схемы собираем статистику для новых индексов
+            conn.execute("PRAGMA analysis_limit = 400")
+            conn.execute("PRAGMA optimize = 0x10002")
+    _initialized_db_path = db_path
+    logging.debug("✅ База данных инициализирована: %s", db_path)
 
 
 def _create_base_tables(conn: sqlite3.Connection) -> None:
@@ -138,7 +208,7 @@ def _create_base_tables(conn: sqlite3.Connection) -> None:
         """
         CREATE TABLE IF NOT EXISTS kv_store (
             key TEXT PRIMARY KEY,
-            value TEXT NOT NULL,
+            value BLOB NOT NULL,
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
         """
@@ -166,6 +236,74 @@ def _ensure_base_schema(conn: sqlite3.Connection) -> None:
         "is_guest",
         "ALTER TABLE players ADD COLUMN is_guest INTEGER NOT NULL DEFAULT 0 CHECK (is_guest IN (0, 1))",
     )
+    # NOCASE-индексы позволяют SQLite применять LIKE-оптимизацию
+    # для поиска по префиксу в find_player_by_name.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_players_name_nocase ON players(name COLLATE NOCASE)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_players_fullname_nocase ON players(fullname COLLATE NOCASE)"
+    )
+    # Частичный индекс отдаёт должников уже отсортированными по fullname
+    # для get_players_with_balance без скана и сортировки всей таблицы.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_players_balance_nonzero ON players(fullname) WHERE balance != 0"
+    )
+    _ensure_players_fts(conn)
+
+
+def _ensure_players_fts(conn: sqlite3.Connection) -> None:
+    """
+    Создаёт FTS5-индекс имён игроков и триггеры его синхронизации.
+
+    Индекс внешнего содержимого (content='players') хранит только токены;
+    триггер обновления срабатывает лишь на изменение name/fullname, поэтому
+    изменения баланса его не затрагивают. Если SQLite собран без FTS5,
+    поиск игроков продолжает работать через LIKE.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'players_fts'"
+    ).fetchone()
+    if exists is not None:
+        return
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE players_fts
+            USING fts5(name, fullname, content='players', content_rowid='id')
+            """
+        )
+    except sqlite3.OperationalError:
+        logging.warning("⚠️ FTS5 недоступен, поиск игроков работает через LIKE")
+        return
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS players_fts_ai AFTER INSERT ON players BEGIN
+            INSERT INTO players_fts(rowid, name, fullname)
+            VALUES (new.id, new.name, new.fullname);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS players_fts_ad AFTER DELETE ON players BEGIN
+            INSERT INTO players_fts(players_fts, rowid, name, fullname)
+            VALUES ('delete', old.id, old.name, old.fullname);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS players_fts_au
+        AFTER UPDATE OF name, fullname ON players BEGIN
+            INSERT INTO players_fts(players_fts, rowid, name, fullname)
+            VALUES ('delete', old.id, old.name, old.fullname);
+            INSERT INTO players_fts(rowid, name, fullname)
+            VALUES (new.id, new.name, new.fullname);
+        END
+        """
+    )
+    conn.execute("INSERT INTO players_fts(players_fts) VALUES ('rebuild')")
 
 
 def _create_current_schema(conn: sqlite3.Connection) -> None:
@@ -417,6 +555,8 @@ def _ensure_current_schema(conn: sqlite3.Connection) -> None:
     if mismatches:
         raise sqlite3.DatabaseError("Incompatible DB schema: " + "; ".join(mismatches))
 
+    # Индексы создаются после проверки: они ссылаются на актуальные столбцы
+    _create_indexes(conn)
     conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 
@@ -440,6 +580,8 @@ def _migrate_schema(conn: sqlite3.Connection) -> None:
         "guest_free_reason",
         "ALTER TABLE game_participants ADD COLUMN guest_free_reason TEXT NOT NULL DEFAULT 'none' CHECK (guest_free_reason IN ('first_games', 'fill_min_players', 'none'))",
     )
+    # Индекс по month заменён покрывающим (month, poll_template_id)
+    conn.execute("DROP INDEX IF EXISTS idx_hall_payments_month")
 
 
 def _ensure_column(
@@ -481,8 +623,19 @@ def _create_indexes(conn: sqlite3.Connection) -> None:
     conn.execute(
         "CREATE INDEX IF NOT EXISTS idx_poll_subscriptions_user_id ON poll_subscriptions(user_id)"
     )
+    # Покрывающий индекс: подзапрос get_unpaid_halls читает только его
     conn.execute(
-        "CREATE INDEX IF NOT EXISTS idx_hall_payments_month ON hall_payments(month)"
+        """
+        CREATE INDEX IF NOT EXISTS idx_hall_payments_month_template
+        ON hall_payments(month, poll_template_id)
+        """
+    )
+    # Частичный индекс: get_unpaid_halls читает только платные залы в порядке id
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_poll_templates_paid
+        ON poll_templates(id) WHERE cost_per_game > 0
+        """
     )
     conn.execute(
         """
@@ -540,123 +693,295 @@ def _create_indexes(conn: sqlite3.Connection) -> None:
     )
 
 
+class _ConnectionState(threading.local):
+    """Соединение с БД текущего потока, его путь и inode файла БД."""
+
+    conn: sqlite3.Connection | None = None
+    path: str | None = None
+    inode: int | None = None
+    depth: int = 0
+
+
+_local = _ConnectionState()
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    """Открывает новое соединение и применяет PRAGMA уровня соединения."""
+    conn = sqlite3.connect(db_path, cached_statements=_STATEMENT_CACHE_SIZE)
+    conn.execute("PRAGMA foreign_keys = ON")
+    if db_path != ":memory:":
+        # В WAL-режиме NORMAL безопасен и избавляет от fsync на каждый коммит
+        conn.execute("PRAGMA synchronous = NORMAL")
+        # Страницы читаются напрямую из отображённого файла, без read()
+        conn.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -8000")
+    return conn
+
+
+def _get_db_inode(db_path: str) -> int | None:
+    """Возвращает inode файла БД или None, если файла нет (или это :memory:)."""
+    if db_path == ":memory:":
+        return None
+    try:
+        return os.stat(db_path).st_ino
+    except OSError:
+        return None
+
+
+def _get_conn() -> sqlite3.Connection:
+    """
+    Возвращает долгоживущее соединение текущего потока.
+
+    Соединение переоткрывается, если изменился путь к БД (например, тесты
+    подменяют VOLLEYBOT_DB_PATH) или файл БД был заменён другим
+    (например, после ./manage.sh db-push): иначе бот продолжал бы работать
+    с удалённым старым файлом.
+    """
+    global _initialized_db_path
+    db_path = _get_db_path()
+    conn = _local.conn
+    if conn is not None and _local.path == db_path:
+        if _local.depth > 0:
+            return conn
+        inode = _get_db_inode(db_path)
+        # Пока новый файл ещё не загружен (inode is None), остаёмся на старом
+        if inode is None or inode == _local.inode:
+            return conn
+        if _local.inode is None:
+            # Файл создан самим этим соединением
+            _local.inode = inode
+            return conn
+        logging.warning("⚠️ Файл БД %s был заменён, переоткрываем соединение", db_path)
+        # Схему новой БД нужно заново проверить
+        _initialized_db_path = None
+
+    if conn is not None:
+        conn.close()
+    conn = _open_connection(db_path)
+    _local.conn = conn
+    _local.path = db_path
+    _local.inode = _get_db_inode(db_path)
+    return conn
+
+
+def close_db() -> None:
+    """
+    Закрывает соединение текущего потока, если оно открыто.
+
+    Перед закрытием выполняется PRAGMA optimize, как рекомендует SQLite:
+    статистика планировщика обновляется только для тех таблиц, где это нужно.
+    """
+    conn = _local.conn
+    _local.conn = None
+    _local.path = None
+    _local.inode = None
+    if conn is not None:
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            logging.exception("❌ Ошибка PRAGMA optimize при закрытии БД")
+        conn.close()
+
+
+def optimize_db() -> None:
+    """Обновляет статистику планировщика запросов (PRAGMA optimize)."""
+    try:
+        _ensure_db_initialized()
+        with _connect() as conn:
+            conn.execute("PRAGMA optimize")
+        logging.debug("✅ PRAGMA optimize выполнен")
+    except sqlite3.Error:
+        logging.exception("❌ Ошибка PRAGMA optimize")
+
+
+# Бот обращается к БД только из потока событийного цикла, поэтому при
+# выходе достаточно закрыть соединение главного потока. close_db видит
+# лишь соединение вызывающего потока: соединение, открытое в другом
+# долгоживущем потоке, осталось бы открытым до завершения процесса.
+atexit.register(close_db)
+
+
 @contextmanager
 def _connect() -> Any:
     """
-    Контекстный менеджер для подключения к БД.
-    Явно закрывает соединение, чтобы избежать ResourceWarning.
+    Контекстный менеджер для работы с БД.
+
+    Переиспользует соединение текущего потока, чтобы не открывать файл БД
+    и не терять кэш страниц на каждом вызове. Незафиксированная транзакция
+    откатывается при выходе, как раньше при закрытии соединения.
     """
-    conn = sqlite3.connect(_get_db_path())
-    conn.execute("PRAGMA foreign_keys = ON")
+    conn = _get_conn()
+    previous_row_factory = conn.row_factory
+    conn.row_factory = None
+    _local.depth += 1
     try:
         yield conn
     finally:
-        conn.close()
+        _local.depth -= 1
+        conn.row_factory = previous_row_factory
+        if _local.depth == 0 and conn.in_transaction:
+            conn.rollback()
 
 
 def save_state(key: str, value: Any) -> None:
-    """Сохраняет JSON-сериализуемое значение по ключу."""
+    """Сохраняет JSON-сериализуемое значение по ключу.
+
+    JSON сериализуется компактно (без пробелов после разделителей),
+    кодируется в UTF-8 заранее и пишется как BLOB, чтобы sqlite3
+    не перекодировал строку при связывании параметра.
+    """
     try:
-        init_db()
-        payload: str = json.dumps(value, ensure_ascii=False)
+        _ensure_db_initialized()
+        payload: bytes = json.dumps(
+            value, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
         logging.debug(
-            f"Сохранение состояния: ключ='{key}', размер данных={len(payload)} байт"
+            "Сохранение состояния: ключ='%s', размер данных=%d байт", key, len(payload)
         )
         with _connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO kv_store(key, value, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(key) DO UPDATE SET
-                    value = excluded.value,
-                    updated_at = CURRENT_TIMESTAMP
-                """,
-                (key, payload),
-            )
+            conn.execute(_SQL_SAVE_STATE, (key, sqlite3.Binary(payload)))
             conn.commit()
-        logging.debug(f"✅ Состояние '{key}' успешно сохранено")
+        logging.debug("✅ Состояние '%s' успешно сохранено", key)
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка SQLite при сохранении состояния '{key}'. "
-            f"Проверьте доступ к БД: {_get_db_path()}"
+            "❌ Ошибка SQLite при сохранении состояния '%s'. Проверьте доступ к БД: %s",
+            key,
+            _get_db_path(),
         )
     except (TypeError, ValueError):
         logging.exception(
-            f"❌ Не удалось сериализовать данные в JSON для ключа '{key}'. "
-            f"Проверьте, что данные сериализуемы."
+            "❌ Не удалось сериализовать данные в JSON для ключа '%s'. "
+            "Проверьте, что данные сериализуемы.",
+            key,
         )
     except OSError:
         logging.exception(
-            f"❌ Ошибка ввода-вывода при сохранении состояния '{key}'. "
-            f"Проверьте права доступа к: {_get_db_path()}"
+            "❌ Ошибка ввода-вывода при сохранении состояния '%s'. "
+            "Проверьте права доступа к: %s",
+            key,
+            _get_db_path(),
         )
 
 
 def load_state(key: str, default: Any = None) -> Any:
     """Загружает состояние по ключу, возвращает default при ошибке/отсутствии."""
     try:
-        init_db()
-        logging.debug(f"Загрузка состояния для ключа: '{key}'")
+        _ensure_db_initialized()
+        logging.debug("Загрузка состояния для ключа: '%s'", key)
         with _connect() as conn:
-            row = conn.execute(
-                "SELECT value FROM kv_store WHERE key = ?", (key,)
-            ).fetchone()
+            row = conn.execute(_SQL_LOAD_STATE, (key,)).fetchone()
         if row is None:
-            logging.debug(f"Состояние для ключа '{key}' не найдено, используем default")
+            logging.debug("Состояние для ключа '%s' не найдено, используем default", key)
             return default
-        result = json.loads(row[0])
-        logging.debug(f"✅ Состояние '{key}' успешно загружено")
+        raw = row[0]
+        # Касса хранится как INTEGER (update_fund_balance): отдаём без JSON
+        if isinstance(raw, int):
+            return raw
+        # Старые записи хранятся как TEXT, новые — как BLOB: json.loads
+        # принимает и str, и bytes.
+        result = json.loads(raw)
+        logging.debug("✅ Состояние '%s' успешно загружено", key)
         return result
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка SQLite при загрузке состояния '{key}'. "
-            f"Возвращаем значение по умолчанию. БД: {_get_db_path()}"
+            "❌ Ошибка SQLite при загрузке состояния '%s'. "
+            "Возвращаем значение по умолчанию. БД: %s",
+            key,
+            _get_db_path(),
         )
         return default
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, UnicodeDecodeError):
         logging.exception(
-            f"❌ Повреждённые данные JSON для ключа '{key}'. "
-            f"Возвращаем значение по умолчанию."
+            "❌ Повреждённые данные JSON для ключа '%s'. "
+            "Возвращаем значение по умолчанию.",
+            key,
         )
         return default
     except OSError:
         logging.exception(
-            f"❌ Ошибка ввода-вывода при загрузке состояния '{key}'. "
-            f"Возвращаем значение по умолчанию. БД: {_get_db_path()}"
+            "❌ Ошибка ввода-вывода при загрузке состояния '%s'. "
+            "Возвращаем значение по умолчанию. БД: %s",
+            key,
+            _get_db_path(),
         )
         return default
 
 
+def _player_rows_to_dicts(
+    cursor: typing.Iterable[tuple[Any, ...]],
+) -> list[dict[str, Any]]:
+    """
+    Собирает строки (id, name, fullname, ball_donate, is_guest, balance) в dict.
+
+    Кортежи распаковываются напрямую из курсора, без sqlite3.Row и fetchall.
+    0/1 (и NULL в старых строках) приводятся к bool для совместимости
+    с логикой, ожидавшей JSON.
+    """
+    return [
+        {
+            "id": player_id,
+            "name": name,
+            "fullname": fullname,
+            "ball_donate": bool(ball_donate),
+            "is_guest": bool(is_guest),
+            "balance": balance,
+        }
+        for player_id, name, fullname, ball_donate, is_guest, balance in cursor
+    ]
+
+
+# Кэш списка игроков: (путь к БД, версия, время чтения, игроки). Любая запись
+# в players через этот модуль увеличивает версию; TTL ограничивает устаревание
+# при изменениях в обход модуля (например, подмене файла БД).
+_PLAYERS_CACHE_TTL = 30.0
+_players_cache_version = 0
+_players_cache: tuple[str, int, float, list[dict[str, Any]]] | None = None
+
+
+def _invalidate_players_cache() -> None:
+    """Помечает кэш списка игроков устаревшим."""
+    global _players_cache_version
+    _players_cache_version += 1
+
+
 def get_all_players() -> list[dict[str, Any]]:
-    """Возвращает список всех игроков из базы данных."""
+    """Возвращает список всех игроков из базы данных (с кэшированием в памяти)."""
+    global _players_cache
+    db_path = _get_db_path()
+    now = time.monotonic()
+    cached = _players_cache
+    if (
+        cached is not None
+        and cached[0] == db_path
+        and cached[1] == _players_cache_version
+        and now - cached[2] < _PLAYERS_CACHE_TTL
+    ):
+        return [dict(player) for player in cached[3]]
+
+    version = _players_cache_version
     try:
         with _connect() as conn:
-            conn.row_factory = sqlite3.Row
             cursor = conn.execute(
                 "SELECT id, name, fullname, ball_donate, is_guest, balance FROM players"
             )
-            players = []
-            for row in cursor.fetchall():
-                player = dict(row)
-                # Преобразуем 0/1 в bool для совместимости с логикой, ожидавшей JSON
-                player["ball_donate"] = bool(player["ball_donate"])
-                player["is_guest"] = bool(player["is_guest"])
-                players.append(player)
-            return players
+            players = _player_rows_to_dicts(cursor)
     except sqlite3.Error:
         logging.exception("❌ Ошибка при получении списка всех игроков")
         return []
 
+    _players_cache = (db_path, version, now, players)
+    return [dict(player) for player in players]
+
 
 def get_players_with_balance() -> list[dict[str, Any]]:
     """Возвращает список игроков с ненулевым балансом."""
     try:
         with _connect() as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
+            conn.row_factory = _dict_row_factory
+            return conn.execute(
                 "SELECT id, name, fullname, balance FROM players WHERE balance != 0 ORDER BY fullname ASC"
-            )
-            return [dict(row) for row in cursor.fetchall()]
+            ).fetchall()
     except sqlite3.Error:
         logging.exception("❌ Ошибка при получении баланса игроков")
         return []
@@ -667,13 +992,10 @@ def get_player_balance(user_id: int) -> dict[str, Any] | None:
     try:
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
-            row = conn.execute(
-                "SELECT id, name, fullname, balance FROM players WHERE id = ?",
-                (user_id,),
-            ).fetchone()
+            row = conn.execute(_SQL_GET_PLAYER_BALANCE, (user_id,)).fetchone()
             return dict(row) if row else None
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при получении баланса игрока {user_id}")
+        logging.exception("❌ Ошибка при получении баланса игрока %s", user_id)
         return None
 
 
@@ -682,10 +1004,7 @@ def get_player_info(user_id: int) -> dict[str, Any] | None:
     try:
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
-            row = conn.execute(
-                "SELECT id, name, fullname, ball_donate, is_guest, balance FROM players WHERE id = ?",
-                (user_id,),
-            ).fetchone()
+            row = conn.execute(_SQL_GET_PLAYER_INFO, (user_id,)).fetchone()
             if row is None:
                 return None
             player = dict(row)
@@ -693,7 +1012,7 @@ def get_player_info(user_id: int) -> dict[str, Any] | None:
             player["is_guest"] = bool(player["is_guest"])
             return player
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при получении информации об игроке {user_id}")
+        logging.exception("❌ Ошибка при получении информации об игроке %s", user_id)
         return None
 
 
@@ -701,14 +1020,12 @@ def update_player_balance(user_id: int, amount: int) -> bool:
     """Изменяет баланс игрока на указанную сумму (может быть отрицательной)."""
     try:
         with _connect() as conn:
-            cursor = conn.execute(
-                "UPDATE players SET balance = balance + ? WHERE id = ?",
-                (amount, user_id),
-            )
+            cursor = conn.execute(_SQL_ADD_PLAYER_BALANCE, (amount, user_id))
             conn.commit()
+            _invalidate_players_cache()
             return cursor.rowcount > 0
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при обновлении баланса игрока {user_id}")
+        logging.exception("❌ Ошибка при обновлении баланса игрока %s", user_id)
         return False
 
 
@@ -735,9 +1052,10 @@ def toggle_player_ball_donate(user_id: int) -> bool | None:
                 "SELECT ball_donate FROM players WHERE id = ?", (user_id,)
             ).fetchone()
             conn.commit()
+            _invalidate_players_cache()
             return bool(row[0]) if row is not None else None
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при переключении ball_donate игрока {user_id}")
+        logging.exception("❌ Ошибка при переключении ball_donate игрока %s", user_id)
         return None
 
 
@@ -754,18 +1072,18 @@ def set_player_guest(user_id: int, is_guest: bool) -> bool:
                 (1 if is_guest else 0, user_id),
             )
             conn.commit()
+            _invalidate_players_cache()
             return cursor.rowcount > 0
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при изменении гостевого статуса игрока {user_id}")
+        logging.exception("❌ Ошибка при изменении гостевого статуса игрока %s", user_id)
         return False
 
 
 def get_guest_players() -> list[dict[str, Any]]:
     """Возвращает игроков с ручным гостевым флагом."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
-            conn.row_factory = sqlite3.Row
             cursor = conn.execute(
                 """
                 SELECT id, name, fullname, ball_donate, is_guest, balance
@@ -774,44 +1092,108 @@ def get_guest_players() -> list[dict[str, Any]]:
                 ORDER BY COALESCE(fullname, name, id)
                 """
             )
-            players = []
-            for row in cursor.fetchall():
-                player = dict(row)
-                player["ball_donate"] = bool(player["ball_donate"])
-                player["is_guest"] = bool(player["is_guest"])
-                players.append(player)
-            return players
+            return _player_rows_to_dicts(cursor)
     except sqlite3.Error:
         logging.exception("❌ Ошибка при получении списка гостей")
         return []
 
 
+def _dict_row_factory(cursor: sqlite3.Cursor, row: tuple[Any, ...]) -> dict[str, Any]:
+    """Собирает строку результата сразу в dict, минуя промежуточный sqlite3.Row."""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _escape_like(value: str) -> str:
+    """Экранирует спецсимволы LIKE (%, _ и \\) для ESCAPE '\\'."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts_prefix_query(query: str) -> str | None:
+    """Превращает запрос в FTS5 MATCH: каждое слово — префикс в кавычках."""
+    words = query.split()
+    if not words:
+        return None
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+_SQL_FIND_PLAYERS_LIKE = """
+    SELECT id, name, fullname, ball_donate, is_guest, balance
+    FROM players
+    WHERE name LIKE ? ESCAPE '\\'
+       OR fullname LIKE ? ESCAPE '\\'
+    ORDER BY fullname ASC
+"""
+_SQL_FIND_PLAYERS_FTS = """
+    SELECT p.id, p.name, p.fullname, p.ball_donate, p.is_guest, p.balance
+    FROM players_fts
+    JOIN players p ON p.id = players_fts.rowid
+    WHERE players_fts MATCH ?
+    ORDER BY p.fullname ASC
+"""
+_SQL_FIND_PLAYERS_BY_USERNAME = """
+    SELECT id, name, fullname, ball_donate, is_guest, balance
+    FROM players
+    WHERE name = ? COLLATE NOCASE
+"""
+
+
 def find_player_by_name(query: str) -> list[dict[str, Any]]:
-    """Ищет игроков по части имени или fullname."""
+    """
+    Ищет игроков по имени или fullname.
+
+    Поиск идёт по ступеням, пока что-то не найдётся:
+    0. Для запроса вида @username — точное совпадение username по индексу
+       idx_players_name_nocase; похожие имена в этом случае не предлагаются.
+    1. Префикс всей строки — NOCASE-индексы idx_players_name_nocase и
+       idx_players_fullname_nocase.
+    2. Префиксы слов (например, фамилия) — FTS5-индекс players_fts.
+    3. Подстрока — полный скан через LIKE; также запасной путь, если FTS5
+       недоступен или запрос не разбирается как MATCH.
+    """
+    clean_query = query.strip()
+    is_username = clean_query.startswith("@")
+    clean_query = clean_query.lstrip("@")
+    escaped = _escape_like(clean_query)
     try:
         with _connect() as conn:
-            conn.row_factory = sqlite3.Row
-            pattern = f"%{query}%"
-            cursor = conn.execute(
-                "SELECT id, name, fullname, is_guest, balance FROM players WHERE name LIKE ? OR fullname LIKE ? ORDER BY fullname ASC",
-                (pattern, pattern),
-            )
-            players = []
-            for row in cursor.fetchall():
-                player = dict(row)
+            conn.row_factory = _dict_row_factory
+            players: list[dict[str, Any]] = []
+            if is_username:
+                players = conn.execute(
+                    _SQL_FIND_PLAYERS_BY_USERNAME, (clean_query,)
+                ).fetchall()
+            if not players:
+                prefix = f"{escaped}%"
+                players = conn.execute(
+                    _SQL_FIND_PLAYERS_LIKE, (prefix, prefix)
+                ).fetchall()
+            fts_query = _fts_prefix_query(clean_query)
+            if not players and fts_query is not None:
+                try:
+                    players = conn.execute(
+                        _SQL_FIND_PLAYERS_FTS, (fts_query,)
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    players = []
+            if not players:
+                substring = f"%{escaped}%"
+                players = conn.execute(
+                    _SQL_FIND_PLAYERS_LIKE, (substring, substring)
+                ).fetchall()
+            for player in players:
+                player["ball_donate"] = bool(player["ball_donate"])
                 player["is_guest"] = bool(player["is_guest"])
-                players.append(player)
             return players
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при поиске игрока: {query}")
+        logging.exception("❌ Ошибка при поиске игрока: %s", query)
         return []
 
 
 def ensure_player(
     user_id: int, name: str | None = None, fullname: str | None = None
-) -> None:
+) -> dict[str, Any] | None:
     """
-    Гарантирует наличие игрока в базе данных.
+    Гарантирует наличие игрока в базе данных и возвращает его данные.
 
     При конфликте (игрок уже существует):
     - name обновляется свежим Telegram username, если он валидный и не пустой
@@ -819,63 +1201,124 @@ def ensure_player(
 
     Это сохраняет вручную установленные отображаемые имена, но не держит
     устаревшие Telegram username.
+
+    Если данные не изменились (самый частый случай), WHERE в DO UPDATE
+    не срабатывает и SQLite не выполняет запись. Вставленная или изменённая
+    строка приходит через RETURNING, неизменённая читается отдельным SELECT.
+
+    Returns:
+        Данные игрока в формате get_player_info или None при ошибке
     """
     name = normalize_telegram_username(name)
 
     try:
         with _connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO players (id, name, fullname)
-                VALUES (?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    name = COALESCE(excluded.name, players.name),
-                    fullname = COALESCE(players.fullname, excluded.fullname),
-                    updated_at = CURRENT_TIMESTAMP
-                """,
-                (user_id, name, fullname),
-            )
+            row = conn.execute(
+                _SQL_ENSURE_PLAYER, (user_id, name, fullname)
+            ).fetchone()
             conn.commit()
+            if row is not None:
+                # RETURNING отдаёт строку только при вставке или изменении
+                _invalidate_players_cache()
+            else:
+                row = conn.execute(_SQL_GET_PLAYER_INFO, (user_id,)).fetchone()
+            if row is None:
+                return None
+            return _player_rows_to_dicts([row])[0]
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при регистрации/обновлении игрока {user_id}")
+        logging.exception("❌ Ошибка при регистрации/обновлении игрока %s", user_id)
+        return None
+
+
+# Столбцы poll_templates, которые отдаются вызывающему коду как PollTemplate.
+# created_at/updated_at не читаются ботом и в выборку не входят.
+_POLL_TEMPLATE_COLUMNS = (
+    "id",
+    "name",
+    "place",
+    "message",
+    "open_day",
+    "open_hour_utc",
+    "open_minute_utc",
+    "game_day",
+    "game_hour_utc",
+    "game_minute_utc",
+    "cost",
+    "cost_per_game",
+    "enabled",
+)
+_SQL_POLL_TEMPLATE_COLUMNS = ", ".join(
+    f"pt.{column}" for column in _POLL_TEMPLATE_COLUMNS
+)
+_SQL_GET_POLL_TEMPLATES = (
+    f"SELECT {_SQL_POLL_TEMPLATE_COLUMNS} FROM poll_templates pt ORDER BY pt.id"
+)
+
+# Кэш шаблонов опросов: (путь к БД, версия, шаблоны). Любая запись в
+# poll_templates/poll_subscriptions через этот модуль увеличивает версию.
+_poll_templates_cache_version = 0
+_poll_templates_cache: tuple[str, int, list[PollTemplate]] | None = None
+
+
+def _invalidate_poll_templates_cache() -> None:
+    """Помечает кэш шаблонов опросов устаревшим."""
+    global _poll_templates_cache_version
+    _poll_templates_cache_version += 1
+
+
+def _copy_poll_templates(templates: list[PollTemplate]) -> list[PollTemplate]:
+    """Возвращает копии шаблонов, чтобы вызывающий код не портил кэш."""
+    return [
+        typing.cast(PollTemplate, {**template, "subs": list(template["subs"])})
+        for template in templates
+    ]
 
 
 def get_poll_templates() -> list[PollTemplate]:
-    """Возвращает все шаблоны опросов из БД."""
+    """Возвращает все шаблоны опросов из БД (с кэшированием в памяти)."""
+    global _poll_templates_cache
+    db_path = _get_db_path()
+    cached = _poll_templates_cache
+    if (
+        cached is not None
+        and cached[0] == db_path
+        and cached[1] == _poll_templates_cache_version
+    ):
+        return _copy_poll_templates(cached[2])
+
+    version = _poll_templates_cache_version
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
-            conn.row_factory = sqlite3.Row
-            template_rows = conn.execute(
-                "SELECT * FROM poll_templates ORDER BY id"
-            ).fetchall()
+            template_rows = conn.execute(_SQL_GET_POLL_TEMPLATES).fetchall()
             subs_by_template: dict[int, list[int]] = defaultdict(list)
             sub_rows = conn.execute(
                 "SELECT poll_template_id, user_id FROM poll_subscriptions"
             ).fetchall()
-            for sub_row in sub_rows:
-                subs_by_template[int(sub_row["poll_template_id"])].append(
-                    int(sub_row["user_id"])
-                )
+            for poll_template_id, user_id in sub_rows:
+                subs_by_template[int(poll_template_id)].append(int(user_id))
 
             templates = []
             for row in template_rows:
-                template = dict(row)
-                template_id = int(template["id"])
-                template["subs"] = subs_by_template.get(template_id, [])
+                template = typing.cast(
+                    PollTemplate, dict(zip(_POLL_TEMPLATE_COLUMNS, row))
+                )
+                template["subs"] = subs_by_template.get(int(template["id"]), [])
                 templates.append(template)
-            return templates
     except sqlite3.Error:
         logging.exception("❌ Ошибка при получении шаблонов опросов")
         return []
 
+    _poll_templates_cache = (db_path, version, templates)
+    return _copy_poll_templates(templates)
+
 
 def add_poll_subscription(
     poll_template_id: int, user_id: int
 ) -> Literal["success", "duplicate", "missing_hall", "missing_player", "error"]:
     """Добавляет игрока в подписчики конкретного шаблона опроса."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             hall_row = conn.execute(
                 "SELECT 1 FROM poll_templates WHERE id = ?",
@@ -909,17 +1352,21 @@ def add_poll_subscription(
                 (poll_template_id, user_id),
             )
             conn.commit()
+            _invalidate_poll_templates_cache()
             return "success"
     except sqlite3.IntegrityError:
         logging.exception(
-            "❌ Ошибка целостности при добавлении подписки: "
-            f"poll_template_id={poll_template_id}, user_id={user_id}"
+            "❌ Ошибка целостности при добавлении подписки: poll_template_id=%s, "
+            "user_id=%s",
+            poll_template_id,
+            user_id,
         )
         return "error"
     except sqlite3.Error:
         logging.exception(
-            "❌ Ошибка при добавлении подписки: "
-            f"poll_template_id={poll_template_id}, user_id={user_id}"
+            "❌ Ошибка при добавлении подписки: poll_template_id=%s, user_id=%s",
+            poll_template_id,
+            user_id,
         )
         return "error"
 
@@ -939,7 +1386,7 @@ def save_poll_template(
         raise ValueError("match_by должен быть 'name' или 'id'")
 
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             values = (
                 template["name"],
@@ -1016,19 +1463,19 @@ def save_poll_template(
                     "DELETE FROM poll_subscriptions WHERE poll_template_id = ?",
                     (poll_template_id,),
                 )
-                for user_id in template["subs"]:
-                    conn.execute(
-                        """
-                        INSERT OR IGNORE INTO poll_subscriptions (poll_template_id, user_id)
-                        VALUES (?, ?)
-                        """,
-                        (poll_template_id, user_id),
-                    )
+                conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO poll_subscriptions (poll_template_id, user_id)
+                    VALUES (?, ?)
+                    """,
+                    [(poll_template_id, user_id) for user_id in template["subs"]],
+                )
             conn.commit()
+            _invalidate_poll_templates_cache()
             return poll_template_id
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при сохранении шаблона опроса '{template.get('name')}'"
+            "❌ Ошибка при сохранении шаблона опроса '%s'", template.get("name")
         )
         return None
 
@@ -1036,7 +1483,7 @@ def save_poll_template(
 def clear_paid_poll_subscriptions() -> None:
     """Очищает подписки для всех платных опросов (cost > 0)."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1047,6 +1494,7 @@ def clear_paid_poll_subscriptions() -> None:
                 """
             )
             conn.commit()
+        _invalidate_poll_templates_cache()
         logging.info("✅ Подписки для платных опросов очищены")
     except sqlite3.Error:
         logging.exception("❌ Ошибка при очистке подписок для платных опросов")
@@ -1070,7 +1518,7 @@ def add_transaction(
         poll_name_snapshot: Историческое имя зала в момент транзакции
     """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1089,29 +1537,34 @@ def add_transaction(
             )
             conn.commit()
         logging.debug(
-            "✅ Транзакция добавлена: "
-            f"player_id={player_id}, amount={amount}, poll_template_id={poll_template_id}, "
-            f"poll_name_snapshot={poll_name_snapshot}"
+            "✅ Транзакция добавлена: player_id=%s, amount=%s, poll_template_id=%s, "
+            "poll_name_snapshot=%s",
+            player_id,
+            amount,
+            poll_template_id,
+            poll_name_snapshot,
         )
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при добавлении транзакции для игрока {player_id}")
+        logging.exception("❌ Ошибка при добавлении транзакции для игрока %s", player_id)
 
 
 # ── Fund (касса) ────────────────────────────────────────────────────────────
 
 
 def get_fund_balance() -> int:
-    """Возвращает текущий баланс кассы."""
+    """
+    Возвращает текущий баланс кассы.
+
+    Значение хранится в kv_store как INTEGER, поэтому читается без JSON.
+    """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
-            row = conn.execute(
-                "SELECT value FROM kv_store WHERE key = ?", (FUND_BALANCE_KEY,)
-            ).fetchone()
+            row = conn.execute(_SQL_LOAD_STATE, (FUND_BALANCE_KEY,)).fetchone()
         if row is None:
             return 0
         return int(row[0])
-    except (sqlite3.Error, json.JSONDecodeError, ValueError):
+    except (sqlite3.Error, ValueError):
         logging.exception("❌ Ошибка при получении баланса кассы")
         return 0
 
@@ -1124,7 +1577,7 @@ def update_fund_balance(amount: int) -> None:
         amount: Сумма изменения (положительная — пополнение, отрицательная — списание)
     """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             row = conn.execute(
                 """
@@ -1139,9 +1592,9 @@ def update_fund_balance(amount: int) -> None:
             ).fetchone()
             conn.commit()
         new_balance = int(row[0]) if row else 0
-        logging.info(f"💰 Касса изменена на {amount:+d}, новый баланс: {new_balance}")
+        logging.info("💰 Касса изменена на %+d, новый баланс: %s", amount, new_balance)
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при обновлении баланса кассы на {amount}")
+        logging.exception("❌ Ошибка при обновлении баланса кассы на %s", amount)
 
 
 def update_player_and_fund_balance_atomic(
@@ -1150,7 +1603,7 @@ def update_player_and_fund_balance_atomic(
     description: str,
     poll_template_id: int | None = None,
     poll_name_snapshot: str | None = None,
-) -> bool:
+) -> dict[str, Any] | None:
     """
     Атомарно изменяет баланс игрока, кассу и добавляет транзакцию в одной транзакции.
 
@@ -1165,20 +1618,23 @@ def update_player_and_fund_balance_atomic(
         poll_name_snapshot: Историческое имя зала (необязательно)
 
     Returns:
-        True если все операции успешны, иначе False
+        Данные игрока после изменения (id, name, fullname, balance) или None,
+        если игрок не найден либо произошла ошибка
     """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
-            # 1. Обновить баланс игрока
-            cursor = conn.execute(
-                "UPDATE players SET balance = balance + ? WHERE id = ?",
-                (amount, player_id),
-            )
-            if cursor.rowcount == 0:
+            # 1. Обновить баланс игрока; RETURNING отдаёт строку после изменения
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                _SQL_ADD_PLAYER_BALANCE_RETURNING, (amount, player_id)
+            ).fetchone()
+            if row is None:
                 conn.rollback()
-                logging.warning(f"⚠️ Игрок {player_id} не найден для обновления баланса")
-                return False
+                logging.warning(
+                    "⚠️ Игрок %s не найден для обновления баланса", player_id
+                )
+                return None
 
             # 2. Обновить баланс кассы (атомарно в той же транзакции)
             conn.execute(
@@ -1203,16 +1659,18 @@ def update_player_and_fund_balance_atomic(
             )
 
             conn.commit()
+            _invalidate_players_cache()
             logging.info(
-                f"💰 Атомарно обновлён баланс игрока {player_id}: {amount:+d}, "
-                f"касса +{amount:+d}, транзакция: {description}"
+                "💰 Атомарно обновлён баланс игрока %s: %+d, касса +%+d, транзакция: %s",
+                player_id,
+                amount,
+                amount,
+                description,
             )
-            return True
+            return dict(row)
     except sqlite3.Error:
-        logging.exception(
-            f"❌ Ошибка атомарного обновления баланса игрока {player_id}"
-        )
-        return False
+        logging.exception("❌ Ошибка атомарного обновления баланса игрока %s", player_id)
+        return None
 
 
 def update_player_and_transaction_atomic(
@@ -1221,7 +1679,7 @@ def update_player_and_transaction_atomic(
     description: str,
     poll_template_id: int | None = None,
     poll_name_snapshot: str | None = None,
-) -> bool:
+) -> dict[str, Any] | None:
     """
     Атомарно изменяет баланс игрока и добавляет транзакцию (без изменения кассы).
 
@@ -1235,20 +1693,23 @@ def update_player_and_transaction_atomic(
         poll_name_snapshot: Историческое имя зала (необязательно)
 
     Returns:
-        True если все операции успешны, иначе False
+        Данные игрока после изменения (id, name, fullname, balance) или None,
+        если игрок не найден либо произошла ошибка
     """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
-            # 1. Обновить баланс игрока
-            cursor = conn.execute(
-                "UPDATE players SET balance = balance + ? WHERE id = ?",
-                (amount, player_id),
-            )
-            if cursor.rowcount == 0:
+            # 1. Обновить баланс игрока; RETURNING отдаёт строку после изменения
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                _SQL_ADD_PLAYER_BALANCE_RETURNING, (amount, player_id)
+            ).fetchone()
+            if row is None:
                 conn.rollback()
-                logging.warning(f"⚠️ Игрок {player_id} не найден для восстановления баланса")
-                return False
+                logging.warning(
+                    "⚠️ Игрок %s не найден для восстановления баланса", player_id
+                )
+                return None
 
             # 2. Добавить транзакцию (касса НЕ меняется)
             conn.execute(
@@ -1261,16 +1722,83 @@ def update_player_and_transaction_atomic(
             )
 
             conn.commit()
+            _invalidate_players_cache()
             logging.info(
-                f"🔄 Атомарно восстановлен баланс игрока {player_id}: {amount:+d}, "
-                f"касса не изменена, транзакция: {description}"
+                "🔄 Атомарно восстановлен баланс игрока %s: %+d, касса не изменена, "
+                "транзакция: %s",
+                player_id,
+                amount,
+                description,
             )
-            return True
+            return dict(row)
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка атомарного восстановления баланса игрока {player_id}"
+            "❌ Ошибка атомарного восстановления баланса игрока %s", player_id
         )
-        return False
+        return None
+
+
+def charge_player_atomic(
+    player_id: int,
+    cost: int,
+    description: str,
+    *,
+    name: str | None = None,
+    fullname: str | None = None,
+    poll_template_id: int | None = None,
+    poll_name_snapshot: str | None = None,
+) -> dict[str, Any] | None:
+    """
+    Атомарно регистрирует игрока, списывает с него cost и пишет транзакцию.
+
+    Регистрация игрока, списание через UPDATE ... RETURNING и запись в
+    истории идут одной транзакцией с одним коммитом: списание и запись
+    в истории не могут разойтись.
+
+    Args:
+        player_id: ID игрока
+        cost: Сумма списания (положительная)
+        description: Описание транзакции
+        name: Telegram username для ensure_player (необязательно)
+        fullname: Отображаемое имя для ensure_player (необязательно)
+        poll_template_id: ID шаблона опроса (необязательно)
+        poll_name_snapshot: Историческое имя зала (необязательно)
+
+    Returns:
+        Данные игрока в формате get_player_balance с балансом после списания
+        или None при ошибке (изменения откатываются)
+    """
+    try:
+        _ensure_db_initialized()
+        with _connect() as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute(
+                _SQL_ENSURE_PLAYER,
+                (player_id, normalize_telegram_username(name), fullname),
+            )
+            row = conn.execute(
+                """
+                UPDATE players SET balance = balance - ? WHERE id = ?
+                RETURNING id, name, fullname, balance
+                """,
+                (cost, player_id),
+            ).fetchone()
+            conn.execute(
+                """
+                INSERT INTO transactions (
+                    player_id, amount, description, poll_template_id, poll_name_snapshot
+                ) VALUES (?, ?, ?, ?, ?)
+                """,
+                (player_id, -cost, description, poll_template_id, poll_name_snapshot),
+            )
+            conn.commit()
+            _invalidate_players_cache()
+            return dict(row)
+    except sqlite3.Error:
+        logging.exception(
+            "❌ Ошибка атомарного списания %s₽ с игрока %s", cost, player_id
+        )
+        return None
 
 
 # ── Hall payments (оплата залов) ─────────────────────────────────────────────
@@ -1286,20 +1814,17 @@ def get_unpaid_halls(month: str) -> list[PollTemplate]:
     Returns:
         Список шаблонов опросов с cost_per_game > 0, не имеющих записи в hall_payments
     """
-    from typing import cast
-
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
-            conn.row_factory = sqlite3.Row
             template_rows = conn.execute(
-                """
-                SELECT pt.*
+                f"""
+                SELECT {_SQL_POLL_TEMPLATE_COLUMNS}
                 FROM poll_templates pt
+                LEFT JOIN hall_payments hp
+                    ON hp.poll_template_id = pt.id AND hp.month = ?
                 WHERE pt.cost_per_game > 0
-                  AND pt.id NOT IN (
-                      SELECT hp.poll_template_id FROM hall_payments hp WHERE hp.month = ?
-                  )
+                  AND hp.poll_template_id IS NULL
                 ORDER BY pt.id
                 """,
                 (month,),
@@ -1308,19 +1833,18 @@ def get_unpaid_halls(month: str) -> list[PollTemplate]:
             sub_rows = conn.execute(
                 "SELECT poll_template_id, user_id FROM poll_subscriptions"
             ).fetchall()
-            for sub_row in sub_rows:
-                subs_by_template[int(sub_row["poll_template_id"])].append(
-                    int(sub_row["user_id"])
-                )
+            for poll_template_id, user_id in sub_rows:
+                subs_by_template[int(poll_template_id)].append(int(user_id))
             templates: list[PollTemplate] = []
             for row in template_rows:
-                template = cast(PollTemplate, dict(row))
-                template_id = int(template["id"])
-                template["subs"] = subs_by_template.get(template_id, [])
+                template = typing.cast(
+                    PollTemplate, dict(zip(_POLL_TEMPLATE_COLUMNS, row))
+                )
+                template["subs"] = subs_by_template.get(int(template["id"]), [])
                 templates.append(template)
             return templates
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при получении неоплаченных залов за {month}")
+        logging.exception("❌ Ошибка при получении неоплаченных залов за %s", month)
         return []
 
 
@@ -1337,7 +1861,7 @@ def record_hall_payment(poll_template_id: int, month: str, amount: int) -> bool:
         True если запись успешно добавлена, False при ошибке
     """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1348,18 +1872,24 @@ def record_hall_payment(poll_template_id: int, month: str, amount: int) -> bool:
             )
             conn.commit()
         logging.info(
-            "✅ Оплата зала записана: "
-            f"poll_template_id={poll_template_id}, месяц={month}, сумма={amount}"
+            "✅ Оплата зала записана: poll_template_id=%s, месяц=%s, сумма=%s",
+            poll_template_id,
+            month,
+            amount,
         )
         return True
     except sqlite3.IntegrityError:
         logging.warning(
-            f"⚠️ Зал с poll_template_id={poll_template_id} за {month} уже оплачен (дубликат)"
+            "⚠️ Зал с poll_template_id=%s за %s уже оплачен (дубликат)",
+            poll_template_id,
+            month,
         )
         return False
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при записи оплаты зала poll_template_id={poll_template_id} за {month}"
+            "❌ Ошибка при записи оплаты зала poll_template_id=%s за %s",
+            poll_template_id,
+            month,
         )
         return False
 
@@ -1390,7 +1920,7 @@ def record_hall_payment_atomic(
         "error" для прочих ошибок
     """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             # 1. Записать оплату зала
             try:
@@ -1403,9 +1933,7 @@ def record_hall_payment_atomic(
                 )
             except sqlite3.IntegrityError:
                 conn.rollback()
-                logging.warning(
-                    f"⚠️ Зал {poll_name} за {month} уже оплачен"
-                )
+                logging.warning("⚠️ Зал %s за %s уже оплачен", poll_name, month)
                 return "duplicate"
 
             # 2. Уменьшить баланс кассы
@@ -1438,14 +1966,16 @@ def record_hall_payment_atomic(
 
             conn.commit()
             logging.info(
-                f"🏟 Атомарно оплачен зал {poll_name} за {month}: {amount}₽, "
-                f"касса -{amount}₽, транзакция добавлена"
+                "🏟 Атомарно оплачен зал %s за %s: %s₽, касса -%s₽, транзакция "
+                "добавлена",
+                poll_name,
+                month,
+                amount,
+                amount,
             )
             return "success"
     except sqlite3.Error:
-        logging.exception(
-            f"❌ Ошибка атомарной оплаты зала {poll_name} за {month}"
-        )
+        logging.exception("❌ Ошибка атомарной оплаты зала %s за %s", poll_name, month)
         return "error"
 
 
@@ -1478,7 +2008,7 @@ def create_game(
         True если запись успешно создана/обновлена, иначе False
     """
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1533,10 +2063,10 @@ def create_game(
                 ),
             )
             conn.commit()
-            logging.info(f"✅ Запись игры создана/обновлена: poll_id={poll_id}")
+            logging.info("✅ Запись игры создана/обновлена: poll_id=%s", poll_id)
             return True
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при создании игры poll_id={poll_id}")
+        logging.exception("❌ Ошибка при создании игры poll_id=%s", poll_id)
         return False
 
 
@@ -1548,7 +2078,7 @@ def update_game_info_message(
 ) -> None:
     """Обновляет ID информационного сообщения и кеш текста."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1563,14 +2093,14 @@ def update_game_info_message(
             conn.commit()
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при обновлении info_message_id для игры poll_id={poll_id}"
+            "❌ Ошибка при обновлении info_message_id для игры poll_id=%s", poll_id
         )
 
 
 def update_game_last_info_text(poll_id: str, text: str) -> None:
     """Обновляет последний отправленный текст промежуточного сообщения."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1583,7 +2113,7 @@ def update_game_last_info_text(poll_id: str, text: str) -> None:
             conn.commit()
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при обновлении last_info_text для игры poll_id={poll_id}"
+            "❌ Ошибка при обновлении last_info_text для игры poll_id=%s", poll_id
         )
 
 
@@ -1596,7 +2126,7 @@ def close_game(
 ) -> None:
     """Закрывает игру в БД."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1611,13 +2141,13 @@ def close_game(
             )
             conn.commit()
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при закрытии игры poll_id={poll_id}")
+        logging.exception("❌ Ошибка при закрытии игры poll_id=%s", poll_id)
 
 
 def save_monthly_vote(game_poll_id: str, player_id: int, option_ids: list[int]) -> None:
     """Сохраняет выбор пользователя в месячном голосовании."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 """
@@ -1632,14 +2162,16 @@ def save_monthly_vote(game_poll_id: str, player_id: int, option_ids: list[int])
             conn.commit()
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при сохранении monthly vote game_poll_id={game_poll_id}, player_id={player_id}"
+            "❌ Ошибка при сохранении monthly vote game_poll_id=%s, player_id=%s",
+            game_poll_id,
+            player_id,
         )
 
 
 def load_monthly_votes(game_poll_id: str) -> dict[int, list[int]]:
     """Возвращает сохранённые голоса месячного опроса."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             rows = conn.execute(
                 """
@@ -1661,7 +2193,7 @@ def load_monthly_votes(game_poll_id: str) -> dict[int, list[int]]:
         return result
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при загрузке monthly votes game_poll_id={game_poll_id}"
+            "❌ Ошибка при загрузке monthly votes game_poll_id=%s", game_poll_id
         )
         return {}
 
@@ -1669,7 +2201,7 @@ def load_monthly_votes(game_poll_id: str) -> dict[int, list[int]]:
 def get_game(poll_id: str) -> dict[str, Any] | None:
     """Возвращает игру по poll_id."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             row = conn.execute(
@@ -1678,14 +2210,14 @@ def get_game(poll_id: str) -> dict[str, Any] | None:
             ).fetchone()
         return dict(row) if row else None
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при получении игры poll_id={poll_id}")
+        logging.exception("❌ Ошибка при получении игры poll_id=%s", poll_id)
         return None
 
 
 def get_open_games() -> list[dict[str, Any]]:
     """Возвращает все открытые игры."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             rows = conn.execute(
@@ -1700,7 +2232,7 @@ def get_open_games() -> list[dict[str, Any]]:
 def get_open_game_by_template_id(poll_template_id: int) -> dict[str, Any] | None:
     """Возвращает открытую regular-игру по шаблону."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             row = conn.execute(
@@ -1718,7 +2250,7 @@ def get_open_game_by_template_id(poll_template_id: int) -> dict[str, Any] | None
         return dict(row) if row else None
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при получении открытой игры для шаблона {poll_template_id}"
+            "❌ Ошибка при получении открытой игры для шаблона %s", poll_template_id
         )
         return None
 
@@ -1726,7 +2258,7 @@ def get_open_game_by_template_id(poll_template_id: int) -> dict[str, Any] | None
 def get_open_monthly_game() -> dict[str, Any] | None:
     """Возвращает открытый месячный опрос."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             row = conn.execute(
@@ -1749,7 +2281,7 @@ def save_game_participants(
 ) -> None:
     """Сохраняет состав и финансовый итог игры."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.execute(
                 "DELETE FROM game_participants WHERE game_poll_id = ?", (game_poll_id,)
@@ -1780,14 +2312,14 @@ def save_game_participants(
             conn.commit()
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при сохранении участников игры game_poll_id={game_poll_id}"
+            "❌ Ошибка при сохранении участников игры game_poll_id=%s", game_poll_id
         )
 
 
 def count_player_regular_participations(player_id: int) -> int:
     """Считает прошлые участия игрока в regular-играх в main/reserve."""
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             row = conn.execute(
                 """
@@ -1803,9 +2335,7 @@ def count_player_regular_participations(player_id: int) -> int:
             ).fetchone()
             return int(row[0] or 0) if row else 0
     except sqlite3.Error:
-        logging.exception(
-            f"❌ Ошибка при подсчёте участий игрока {player_id}"
-        )
+        logging.exception("❌ Ошибка при подсчёте участий игрока %s", player_id)
         return 0
 
 
@@ -1863,7 +2393,7 @@ def get_single_game_income_stats(
         start, _ = _month_bounds(start_month)
         end, _ = _month_bounds(before)
 
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             params: list[Any] = [start, end]
@@ -1937,7 +2467,7 @@ def get_stats_summary(month: str | None = None) -> dict[str, Any]:
     """Сводная статистика по regular-играм."""
     start, end = _month_bounds(month)
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             filter_sql = ""
@@ -1961,27 +2491,24 @@ def get_stats_summary(month: str | None = None) -> dict[str, Any]:
                 params,
             ).fetchone()
 
-            roster_rows = conn.execute(
+            # Средние по играм считаем в SQL, не выгружая построчную историю
+            averages_row = conn.execute(
                 f"""
-                SELECT g.poll_id, COUNT(gp.player_id) AS interested
-                FROM games g
-                LEFT JOIN game_participants gp ON gp.game_poll_id = g.poll_id
-                WHERE g.kind = 'regular' AND g.status = 'closed' {filter_sql}
-                GROUP BY g.poll_id
-                """,
-                params,
-            ).fetchall()
-            main_rows = conn.execute(
-                f"""
-                SELECT g.poll_id, COUNT(gp.player_id) AS main_count
-                FROM games g
-                LEFT JOIN game_participants gp
-                    ON gp.game_poll_id = g.poll_id AND gp.roster_bucket = 'main'
-                WHERE g.kind = 'regular' AND g.status = 'closed' {filter_sql}
-                GROUP BY g.poll_id
+                SELECT
+                    AVG(interested) AS avg_interest,
+                    AVG(main_count) AS avg_main
+                FROM (
+                    SELECT
+                        COUNT(gp.player_id) AS interested,
+                        COUNT(CASE WHEN gp.roster_bucket = 'main' THEN 1 END) AS main_count
+                    FROM games g
+                    LEFT JOIN game_participants gp ON gp.game_poll_id = g.poll_id
+                    WHERE g.kind = 'regular' AND g.status = 'closed' {filter_sql}
+                    GROUP BY g.poll_id
+                )
                 """,
                 params,
-            ).fetchall()
+            ).fetchone()
             monthly_filter = ""
             monthly_params: list[Any] = []
             if start and end:
@@ -1995,16 +2522,8 @@ def get_stats_summary(month: str | None = None) -> dict[str, Any]:
                 """,
                 monthly_params,
             ).fetchone()
-            avg_interest = (
-                sum(int(row["interested"]) for row in roster_rows) / len(roster_rows)
-                if roster_rows
-                else 0.0
-            )
-            avg_main = (
-                sum(int(row["main_count"]) for row in main_rows) / len(main_rows)
-                if main_rows
-                else 0.0
-            )
+            avg_interest = float(averages_row["avg_interest"] or 0.0)
+            avg_main = float(averages_row["avg_main"] or 0.0)
 
             transactions_filter = ""
             tx_params: list[Any] = []
@@ -2075,7 +2594,7 @@ def get_poll_stats(poll_template_id: int, month: str | None = None) -> dict[str,
     """Статистика по одному залу."""
     start, end = _month_bounds(month)
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             filter_sql = ""
@@ -2083,16 +2602,17 @@ def get_poll_stats(poll_template_id: int, month: str | None = None) -> dict[str,
             if start and end:
                 filter_sql = "AND g.closed_at >= ? AND g.closed_at < ?"
                 params.extend([start, end])
-            games = conn.execute(
+            last_game = conn.execute(
                 f"""
-                SELECT g.poll_id, g.poll_name_snapshot, g.closed_at
+                SELECT g.poll_name_snapshot, g.closed_at
                 FROM games g
                 WHERE g.kind = 'regular' AND g.status = 'closed'
                   AND g.poll_template_id = ? {filter_sql}
                 ORDER BY g.closed_at DESC
+                LIMIT 1
                 """,
                 params,
-            ).fetchall()
+            ).fetchone()
             stats_rows = conn.execute(
                 f"""
                 SELECT
@@ -2107,57 +2627,43 @@ def get_poll_stats(poll_template_id: int, month: str | None = None) -> dict[str,
                 """,
                 params,
             ).fetchone()
-            avg_interest_rows = conn.execute(
-                f"""
-                SELECT g.poll_id, COUNT(gp.player_id) AS interested
-                FROM games g
-                LEFT JOIN game_participants gp ON gp.game_poll_id = g.poll_id
-                WHERE g.kind = 'regular' AND g.status = 'closed'
-                  AND g.poll_template_id = ? {filter_sql}
-                GROUP BY g.poll_id
-                """,
-                params,
-            ).fetchall()
-            main_rows = conn.execute(
+            averages_row = conn.execute(
                 f"""
-                SELECT g.poll_id, COUNT(gp.player_id) AS main_count
-                FROM games g
-                LEFT JOIN game_participants gp
-                    ON gp.game_poll_id = g.poll_id AND gp.roster_bucket = 'main'
-                WHERE g.kind = 'regular' AND g.status = 'closed'
-                  AND g.poll_template_id = ? {filter_sql}
-                GROUP BY g.poll_id
+                SELECT
+                    AVG(interested) AS avg_interest,
+                    AVG(main_count) AS avg_main
+                FROM (
+                    SELECT
+                        COUNT(gp.player_id) AS interested,
+                        COUNT(CASE WHEN gp.roster_bucket = 'main' THEN 1 END) AS main_count
+                    FROM games g
+                    LEFT JOIN game_participants gp ON gp.game_poll_id = g.poll_id
+                    WHERE g.kind = 'regular' AND g.status = 'closed'
+                      AND g.poll_template_id = ? {filter_sql}
+                    GROUP BY g.poll_id
+                )
                 """,
                 params,
-            ).fetchall()
+            ).fetchone()
         return {
             "games_count": int(stats_rows["games_count"] or 0) if stats_rows else 0,
             "unique_players": int(stats_rows["unique_players"] or 0)
             if stats_rows
             else 0,
-            "avg_main": (
-                sum(int(row["main_count"]) for row in main_rows) / len(main_rows)
-                if main_rows
-                else 0.0
-            ),
-            "avg_interest": (
-                sum(int(row["interested"]) for row in avg_interest_rows)
-                / len(avg_interest_rows)
-                if avg_interest_rows
-                else 0.0
-            ),
+            "avg_main": float(averages_row["avg_main"] or 0.0),
+            "avg_interest": float(averages_row["avg_interest"] or 0.0),
             "subscription_uses": int(stats_rows["subscription_uses"] or 0)
             if stats_rows
             else 0,
             "single_game_sum": int(stats_rows["single_game_sum"] or 0)
             if stats_rows
             else 0,
-            "last_game": games[0]["closed_at"] if games else None,
-            "poll_name_snapshot": games[0]["poll_name_snapshot"] if games else "",
+            "last_game": last_game["closed_at"] if last_game else None,
+            "poll_name_snapshot": last_game["poll_name_snapshot"] if last_game else "",
         }
     except sqlite3.Error:
         logging.exception(
-            f"❌ Ошибка при получении статистики по шаблону {poll_template_id}"
+            "❌ Ошибка при получении статистики по шаблону %s", poll_template_id
         )
         return {
             "games_count": 0,
@@ -2175,7 +2681,7 @@ def get_player_stats(player_id: int, month: str | None = None) -> dict[str, Any]
     """Статистика по игроку."""
     start, end = _month_bounds(month)
     try:
-        init_db()
+        _ensure_db_initialized()
         with _connect() as conn:
             conn.row_factory = sqlite3.Row
             filter_sql = ""
@@ -2211,7 +2717,7 @@ def get_player_stats(player_id: int, month: str | None = None) -> dict[str, Any]
             "balance": int(balance["balance"]) if balance else 0,
         }
     except sqlite3.Error:
-        logging.exception(f"❌ Ошибка при получении статистики по игроку {player_id}")
+        logging.exception("❌ Ошибка при получении статистики по игроку %s", player_id)
         balance = get_player_balance(player_id)
         return {
             "games_total": 0,
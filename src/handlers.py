@@ -7,10 +7,16 @@ from __future__ import annotations
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Never
+from operator import itemgetter
+from typing import Awaitable, Callable, Never
 
 from aiogram import Bot, Dispatcher, Router
-from aiogram.exceptions import TelegramAPIError, TelegramNetworkError
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -19,6 +25,7 @@ from aiogram.types import (
     BotCommandScopeAllChatAdministrators,
     BotCommandScopeAllGroupChats,
     CallbackQuery,
+    ChatMemberUpdated,
     InaccessibleMessage,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -77,6 +84,93 @@ from .utils import (
 logging.info("🔄 Загружен модуль handlers.py - VERSION 2026-01-29-v2")
 
 
+# Ошибки отправки, после которых ответ повторяется. TelegramRetryAfter —
+# flood control: retry_async ждёт указанное Telegram время перед повтором.
+_SAFE_SEND_EXCEPTIONS = (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    asyncio.TimeoutError,
+    OSError,
+)
+
+# Общий экземпляр вместо создания pydantic-модели на каждый ответ
+_NO_LINK_PREVIEW = LinkPreviewOptions(is_disabled=True)
+
+# Telegram ограничивает сообщение 4096 символами; оставляем запас под HTML-разметку
+MESSAGE_CHUNK_LIMIT = 4000
+
+# Команды для всех пользователей в группах
+BOT_USER_COMMANDS = [
+    BotCommand(command="help", description="Показать справку по командам"),
+    BotCommand(command="schedule", description="Показать расписание опросов"),
+    BotCommand(command="balance", description="Показать мой баланс"),
+    BotCommand(command="stats", description="Показать статистику"),
+]
+
+# Команды для администраторов (включая пользовательские)
+BOT_ADMIN_COMMANDS = [
+    BotCommand(command="help", description="Показать справку по командам"),
+    BotCommand(command="schedule", description="Показать расписание опросов"),
+    BotCommand(command="balance", description="Показать долги/балансы и кассу"),
+    BotCommand(command="stats", description="Статистика по играм и игрокам"),
+    BotCommand(command="subs", description="Абонементы по дням / добавить"),
+    BotCommand(command="pay", description="Изменить баланс / оплата зала"),
+    BotCommand(command="restore", description="Восстановить баланс (без кассы)"),
+    BotCommand(command="open_monthly", description="Тест: открыть опрос абонемента"),
+    BotCommand(command="close_monthly", description="Тест: закрыть опрос абонемента"),
+    BotCommand(command="player", description="Подробная информация об игроках"),
+    BotCommand(command="guest", description="Управление гостями"),
+    BotCommand(command="ball_donate", description="Переключить донат мяча у игрока"),
+    BotCommand(command="hall", description="Управление залами"),
+    BotCommand(command="start", description="Включить бота"),
+    BotCommand(command="stop", description="Выключить бота"),
+    BotCommand(command="webhookinfo", description="Статус webhook"),
+]
+
+
+# Текст /help не зависит от контекста и собирается один раз
+HELP_TEXT = (
+    "🏐 <b>Volleybot — Справка</b>\n\n"
+    "<b>Доступные команды:</b>\n"
+    "/help — показать эту справку\n"
+    "/schedule — показать расписание опросов\n"
+    "/balance — показать мой баланс\n\n"
+    "<b>Команды для администраторов:</b>\n"
+    "/balance — список всех долгов + касса\n"
+    "/subs — абонементы по дням\n"
+    "/subs add HALL_ID игрок — добавить абонемент игроку\n"
+    "/pay [сумма] — изменить баланс (в ответ на сообщение)\n"
+    "/pay [имя] [сумма] — найти игрока и изменить баланс\n"
+    "/pay Оплата зала — оплатить аренду зала из кассы\n"
+    "/restore [сумма] — восстановить баланс без изменения кассы\n"
+    "/restore [имя] [сумма] — найти игрока и восстановить баланс\n"
+    "/player — список всех игроков с подробной информацией\n"
+    "/player [имя] — информация об одном игроке (по имени, @username или ID)\n"
+    "/guest — список гостей / добавить / убрать гостя\n"
+    "/ball_donate — переключить донат мяча у игрока (reply)\n"
+    "/ball_donate [имя] — переключить донат мяча по имени, @username или ID\n"
+    "/hall — управление залами и расписанием\n"
+    "/start — включить бота\n"
+    "/stop — выключить бота\n\n"
+    "<b>Как пользоваться:</b>\n"
+    "Бот автоматически создаёт опросы по расписанию. "
+    "Голосуйте «Да», если планируете участвовать в игре."
+)
+
+
+# Названия дней недели для /schedule и /subs (в порядке вывода)
+SCHEDULE_DAY_NAMES = {
+    "mon": "Понедельник",
+    "tue": "Вторник",
+    "wed": "Среда",
+    "thu": "Четверг",
+    "fri": "Пятница",
+    "sat": "Суббота",
+    "sun": "Воскресенье",
+    "*": "Ежедневно",
+}
+
+
 @retry_async(
     (TelegramNetworkError, asyncio.TimeoutError, OSError),
     tries=None,
@@ -91,51 +185,19 @@ async def setup_bot_commands(bot: Bot) -> None:
     Args:
         bot: Экземпляр бота
     """
-    # Команды для всех пользователей в группах
-    user_commands = [
-        BotCommand(command="help", description="Показать справку по командам"),
-        BotCommand(command="schedule", description="Показать расписание опросов"),
-        BotCommand(command="balance", description="Показать мой баланс"),
-        BotCommand(command="stats", description="Показать статистику"),
-    ]
-
-    # Команды для администраторов (включая пользовательские)
-    admin_commands = [
-        BotCommand(command="help", description="Показать справку по командам"),
-        BotCommand(command="schedule", description="Показать расписание опросов"),
-        BotCommand(command="balance", description="Показать долги/балансы и кассу"),
-        BotCommand(command="stats", description="Статистика по играм и игрокам"),
-        BotCommand(command="subs", description="Абонементы по дням / добавить"),
-        BotCommand(command="pay", description="Изменить баланс / оплата зала"),
-        BotCommand(command="restore", description="Восстановить баланс (без кассы)"),
-        BotCommand(
-            command="open_monthly", description="Тест: открыть опрос абонемента"
+    # Запросы независимы, поэтому отправляем их параллельно. gather (а не
+    # TaskGroup) пробрасывает исходное исключение, и retry_async его узнаёт.
+    await asyncio.gather(
+        # Команды для приватных чатов (по умолчанию, без scope)
+        bot.set_my_commands(commands=BOT_USER_COMMANDS),
+        # Команды для обычных пользователей в группах
+        bot.set_my_commands(
+            commands=BOT_USER_COMMANDS, scope=BotCommandScopeAllGroupChats()
         ),
-        BotCommand(
-            command="close_monthly", description="Тест: закрыть опрос абонемента"
+        # Команды для администраторов всех групп
+        bot.set_my_commands(
+            commands=BOT_ADMIN_COMMANDS, scope=BotCommandScopeAllChatAdministrators()
         ),
-        BotCommand(command="player", description="Подробная информация об игроках"),
-        BotCommand(command="guest", description="Управление гостями"),
-        BotCommand(
-            command="ball_donate", description="Переключить донат мяча у игрока"
-        ),
-        BotCommand(command="hall", description="Управление залами"),
-        BotCommand(command="start", description="Включить бота"),
-        BotCommand(command="stop", description="Выключить бота"),
-        BotCommand(command="webhookinfo", description="Статус webhook"),
-    ]
-
-    # Устанавливаем команды для приватных чатов (по умолчанию, без scope)
-    await bot.set_my_commands(commands=user_commands)
-
-    # Устанавливаем команды для обычных пользователей в группах
-    await bot.set_my_commands(
-        commands=user_commands, scope=BotCommandScopeAllGroupChats()
-    )
-
-    # Устанавливаем команды для администраторов всех групп
-    await bot.set_my_commands(
-        commands=admin_commands, scope=BotCommandScopeAllChatAdministrators()
     )
 
     logging.info("✅ Команды бота зарегистрированы в меню Telegram")
@@ -177,22 +239,20 @@ def _format_player_detail(
     p: dict, poll_templates: list[PollTemplate] | None = None
 ) -> str:
     """Форматирует подробную информацию об одном игроке (HTML)."""
-    link = format_player_link(p)
     player_id = int(p["id"])
-    lines = [
-        f"👤 {link}",
-        f"ID: {player_id}",
-    ]
-    if p.get("name") and str(p["name"]).strip():
-        lines.append(f"🪪 @{escape_html(str(p['name']).strip())}")
-    lines.append(f"💰 Баланс: {p.get('balance', 0)} ₽")
+    name = str(p.get("name") or "").strip()
+    name_line = f"\n🪪 @{escape_html(name)}" if name else ""
     subscription_text = _format_player_subscription_text(player_id, poll_templates)
-    lines.append(f"🎟 Абонемент: {subscription_text}")
     ball = "да" if p.get("ball_donate") else "нет"
-    lines.append(f"🏐 Донат: {ball}")
     guest = "да" if p.get("is_guest") else "нет"
-    lines.append(f"🙋 Гость: {guest}")
-    return "\n".join(lines)
+    return (
+        f"👤 {format_player_link(p)}\n"
+        f"ID: {player_id}{name_line}\n"
+        f"💰 Баланс: {p.get('balance', 0)} ₽\n"
+        f"🎟 Абонемент: {subscription_text}\n"
+        f"🏐 Донат: {ball}\n"
+        f"🙋 Гость: {guest}"
+    )
 
 
 def _format_player_choice_label(p: dict) -> str:
@@ -326,6 +386,42 @@ HALL_WIZARD_STEPS: list[tuple[str, State]] = [
 ]
 
 
+def _split_message_lines(
+    lines: list[str], limit: int = MESSAGE_CHUNK_LIMIT
+) -> list[str]:
+    """Склеивает строки в сообщения не длиннее limit, разрывая только между строк."""
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for line in lines:
+        extra = len(line) + (1 if current else 0)
+        if current and size + extra > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+            extra = len(line)
+        current.append(line)
+        size += extra
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _callback_prefix(data: str | None) -> str:
+    """Возвращает префикс callback data до первого ":" (пустой, если его нет)."""
+    if not data:
+        return ""
+    prefix, sep, _ = data.partition(":")
+    return prefix if sep else ""
+
+
+def _parse_amount(value: str) -> int | None:
+    """Парсит целую сумму со знаком без исключения на нечисловом вводе."""
+    digits = value[1:] if value[:1] in "+-" else value
+    if not digits.isdecimal():
+        return None
+    return int(value)
+
+
 def _previous_hall_day(day: str) -> str:
     """Возвращает предыдущий день недели."""
     return HALL_DAYS[(HALL_DAYS.index(day) - 1) % len(HALL_DAYS)]
@@ -476,6 +572,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
     # Создаём роутер для обработчиков
     router: Router = Router()
 
+    # Сервисы кладутся в workflow_data до регистрации и не переназначаются
+    admin_service: AdminService = dp.workflow_data["admin_service"]
+    bot_state_service: BotStateService = dp.workflow_data["bot_state_service"]
+
     async def safe_reply(
         message: Message,
         text: str,
@@ -486,7 +586,22 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         result = await call_with_network_retry(
             lambda: message.reply(text, **kwargs),
             action_name=action_name,
-            exceptions=(TelegramNetworkError, asyncio.TimeoutError, OSError),
+            exceptions=_SAFE_SEND_EXCEPTIONS,
+            logger=logging.getLogger(__name__),
+        )
+        return result is not None
+
+    async def safe_answer(
+        message: Message,
+        text: str,
+        *,
+        action_name: str,
+        **kwargs,
+    ) -> bool:
+        result = await call_with_network_retry(
+            lambda: message.answer(text, **kwargs),
+            action_name=action_name,
+            exceptions=_SAFE_SEND_EXCEPTIONS,
             logger=logging.getLogger(__name__),
         )
         return result is not None
@@ -500,7 +615,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         result = await call_with_network_retry(
             lambda: callback_query.answer(**kwargs),
             action_name=action_name,
-            exceptions=(TelegramNetworkError, asyncio.TimeoutError, OSError),
+            exceptions=_SAFE_SEND_EXCEPTIONS,
             logger=logging.getLogger(__name__),
         )
         return result is not None
@@ -518,11 +633,32 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         result = await call_with_network_retry(
             lambda: message.edit_text(text, **kwargs),
             action_name=action_name,
-            exceptions=(TelegramNetworkError, asyncio.TimeoutError, OSError),
+            exceptions=_SAFE_SEND_EXCEPTIONS,
             logger=logging.getLogger(__name__),
         )
         return result is not None
 
+    async def _is_message_admin(message: Message) -> bool:
+        """Проверяет права администратора для message-команды."""
+        user = message.from_user
+        if user is None:
+            return False
+
+        return await admin_service.is_admin(bot, user, message.chat.id)
+
+    async def _reply_if_rate_limited(
+        message: Message, user: User | None, is_admin: bool
+    ) -> bool:
+        """Отвечает о превышении rate limit; True означает, что команду прервать."""
+        rate_limit_error = rate_limit_check(user, is_admin)
+        if not rate_limit_error:
+            return False
+        try:
+            await message.reply(rate_limit_error)
+        except TelegramNetworkError:
+            logging.warning("⚠️ Сетевая ошибка при отправке rate limit сообщения")
+        return True
+
     async def _resolve_group_membership(chat_id: int, user_id: int) -> bool | None:
         """Возвращает True/False для членства в группе или None при неясном ответе."""
         try:
@@ -603,20 +739,11 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             logging.error("❌ Получена команда /start без информации о пользователе")
             return
 
-        # Получаем сервисы из workflow_data
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        bot_state_service: BotStateService = dp.workflow_data["bot_state_service"]
-
         # Проверяем, является ли пользователь администратором группы
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
+        is_admin = await _is_message_admin(message)
 
         # Проверка rate limit (после проверки админа)
-        rate_limit_error = rate_limit_check(user, is_admin)
-        if rate_limit_error:
-            try:
-                await message.reply(rate_limit_error)
-            except TelegramNetworkError:
-                logging.warning("⚠️ Сетевая ошибка при отправке rate limit сообщения")
+        if await _reply_if_rate_limited(message, user, is_admin):
             return
 
         if not is_admin:
@@ -625,8 +752,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             except TelegramNetworkError:
                 logging.warning("⚠️ Сетевая ошибка при отправке сообщения")
             logging.warning(
-                f"⚠️ Попытка использования /start от неавторизованного пользователя: "
-                f"@{user.username} (ID: {user.id})"
+                "⚠️ Попытка использования /start от неавторизованного пользователя: "
+                "@%s (ID: %s)",
+                user.username,
+                user.id,
             )
             return
 
@@ -634,7 +763,9 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             if bot_state_service.is_enabled():
                 await message.reply("✅ Бот уже включен и работает.")
                 logging.info(
-                    f"ℹ️ Бот уже включен. Команда /start от администратора @{user.username} (ID: {user.id})"
+                    "ℹ️ Бот уже включен. Команда /start от администратора @%s (ID: %s)",
+                    user.username,
+                    user.id,
                 )
             else:
                 create_backup("bot_start_command")
@@ -643,11 +774,15 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     "✅ Бот включен. Опросы будут создаваться по расписанию."
                 )
                 logging.info(
-                    f"✅ Бот ВКЛЮЧЕН администратором @{user.username} (ID: {user.id})"
+                    "✅ Бот ВКЛЮЧЕН администратором @%s (ID: %s)",
+                    user.username,
+                    user.id,
                 )
         except TelegramNetworkError:
             logging.warning(
-                f"⚠️ Сетевая ошибка при ответе на /start от @{user.username} (ID: {user.id})"
+                "⚠️ Сетевая ошибка при ответе на /start от @%s (ID: %s)",
+                user.username,
+                user.id,
             )
 
     @router.message(Command("stop"))
@@ -658,20 +793,11 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             logging.error("❌ Получена команда /stop без информации о пользователе")
             return
 
-        # Получаем сервисы из workflow_data
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        bot_state_service: BotStateService = dp.workflow_data["bot_state_service"]
-
         # Проверяем, является ли пользователь администратором группы
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
+        is_admin = await _is_message_admin(message)
 
         # Проверка rate limit (после проверки админа)
-        rate_limit_error = rate_limit_check(user, is_admin)
-        if rate_limit_error:
-            try:
-                await message.reply(rate_limit_error)
-            except TelegramNetworkError:
-                logging.warning("⚠️ Сетевая ошибка при отправке rate limit сообщения")
+        if await _reply_if_rate_limited(message, user, is_admin):
             return
 
         if not is_admin:
@@ -680,8 +806,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             except TelegramNetworkError:
                 logging.warning("⚠️ Сетевая ошибка при отправке сообщения")
             logging.warning(
-                f"⚠️ Попытка использования /stop от неавторизованного пользователя: "
-                f"@{user.username} (ID: {user.id})"
+                "⚠️ Попытка использования /stop от неавторизованного пользователя: "
+                "@%s (ID: %s)",
+                user.username,
+                user.id,
             )
             return
 
@@ -689,7 +817,9 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             if not bot_state_service.is_enabled():
                 await message.reply("⚠️ Бот уже выключен.")
                 logging.info(
-                    f"ℹ️ Бот уже выключен. Команда /stop от администратора @{user.username} (ID: {user.id})"
+                    "ℹ️ Бот уже выключен. Команда /stop от администратора @%s (ID: %s)",
+                    user.username,
+                    user.id,
                 )
             else:
                 create_backup("bot_stop_command")
@@ -698,11 +828,15 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     "⏸️ Бот выключен. Опросы не будут создаваться до включения."
                 )
                 logging.info(
-                    f"⏸️ Бот ВЫКЛЮЧЕН администратором @{user.username} (ID: {user.id})"
+                    "⏸️ Бот ВЫКЛЮЧЕН администратором @%s (ID: %s)",
+                    user.username,
+                    user.id,
                 )
         except TelegramNetworkError:
             logging.warning(
-                f"⚠️ Сетевая ошибка при ответе на /stop от @{user.username} (ID: {user.id})"
+                "⚠️ Сетевая ошибка при ответе на /stop от @%s (ID: %s)",
+                user.username,
+                user.id,
             )
 
     @router.message(Command("help"))
@@ -712,58 +846,26 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        # Получаем сервисы из workflow_data
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-
         # Проверяем, является ли пользователь администратором
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
+        is_admin = await _is_message_admin(message)
 
         # Проверка rate limit
-        rate_limit_error = rate_limit_check(user, is_admin)
-        if rate_limit_error:
-            try:
-                await message.reply(rate_limit_error)
-            except TelegramNetworkError:
-                logging.warning("⚠️ Сетевая ошибка при отправке rate limit сообщения")
-            return
-
-        help_text = (
-            "🏐 <b>Volleybot — Справка</b>\n\n"
-            "<b>Доступные команды:</b>\n"
-            "/help — показать эту справку\n"
-            "/schedule — показать расписание опросов\n"
-            "/balance — показать мой баланс\n\n"
-            "<b>Команды для администраторов:</b>\n"
-            "/balance — список всех долгов + касса\n"
-            "/subs — абонементы по дням\n"
-            "/subs add HALL_ID игрок — добавить абонемент игроку\n"
-            "/pay [сумма] — изменить баланс (в ответ на сообщение)\n"
-            "/pay [имя] [сумма] — найти игрока и изменить баланс\n"
-            "/pay Оплата зала — оплатить аренду зала из кассы\n"
-            "/restore [сумма] — восстановить баланс без изменения кассы\n"
-            "/restore [имя] [сумма] — найти игрока и восстановить баланс\n"
-            "/player — список всех игроков с подробной информацией\n"
-            "/player [имя] — информация об одном игроке (по имени, @username или ID)\n"
-            "/guest — список гостей / добавить / убрать гостя\n"
-            "/ball_donate — переключить донат мяча у игрока (reply)\n"
-            "/ball_donate [имя] — переключить донат мяча по имени, @username или ID\n"
-            "/hall — управление залами и расписанием\n"
-            "/start — включить бота\n"
-            "/stop — выключить бота\n\n"
-            "<b>Как пользоваться:</b>\n"
-            "Бот автоматически создаёт опросы по расписанию. "
-            "Голосуйте «Да», если планируете участвовать в игре."
-        )
+        if await _reply_if_rate_limited(message, user, is_admin):
+            return
 
         try:
-            await message.reply(help_text)
+            # Справка не зависит от контекста — отправляем без reply_to
+            await message.answer(HELP_TEXT)
             if user:
                 logging.info(
-                    f"📖 Запрос справки от пользователя @{user.username} (ID: {user.id})"
+                    "📖 Запрос справки от пользователя @%s (ID: %s)",
+                    user.username,
+                    user.id,
                 )
         except TelegramNetworkError:
             logging.warning(
-                f"⚠️ Сетевая ошибка при ответе на /help от @{user.username if user else 'unknown'}"
+                "⚠️ Сетевая ошибка при ответе на /help от @%s",
+                user.username if user else "unknown",
             )
 
     @router.message(Command("schedule"))
@@ -772,12 +874,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         user = message.from_user
 
         # Проверка rate limit
-        rate_limit_error = rate_limit_check(user, is_admin=False)
-        if rate_limit_error:
-            try:
-                await message.reply(rate_limit_error)
-            except TelegramNetworkError:
-                logging.warning("⚠️ Сетевая ошибка при отправке rate limit сообщения")
+        if await _reply_if_rate_limited(message, user, False):
             return
 
         poll_templates = get_poll_templates()
@@ -788,22 +885,11 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 logging.warning("⚠️ Сетевая ошибка при отправке сообщения о расписании")
             return
 
-        # Маппинг дней недели на русский
-        days_ru = {
-            "mon": "Понедельник",
-            "tue": "Вторник",
-            "wed": "Среда",
-            "thu": "Четверг",
-            "fri": "Пятница",
-            "sat": "Суббота",
-            "sun": "Воскресенье",
-            "*": "Ежедневно",
-        }
-
-        schedule_text = "📅 <b>Расписание игр</b> (время МСК)\n\n"
+        lines = ["📅 <b>Расписание игр</b> (время МСК)", ""]
 
         for poll in poll_templates:
-            game_day = days_ru.get(str(poll["game_day"]), str(poll["game_day"]))
+            game_day = str(poll["game_day"])
+            day_name = SCHEDULE_DAY_NAMES.get(game_day, game_day)
 
             # Конвертация в МСК (UTC+3)
             msk_hour = (int(poll["game_hour_utc"]) + 3) % 24
@@ -813,24 +899,29 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             place_info = f" ({place})" if place else ""
             status_info = "" if _is_poll_enabled(poll) else " ⏸️ выключен"
 
-            schedule_text += (
-                f"{game_day} {msk_hour:02d}:{msk_minute:02d}{place_info}{status_info}\n"
+            lines.append(
+                f"{day_name} {msk_hour:02d}:{msk_minute:02d}{place_info}{status_info}"
             )
 
-        schedule_text += (
-            "\n<i>ℹ️ Опрос начинается за день до игры в 19:00 "
+        lines.append("")
+        lines.append(
+            "<i>ℹ️ Опрос начинается за день до игры в 19:00 "
             "и заканчивается за полчаса до начала игры.</i>"
         )
+        schedule_text = "\n".join(lines)
 
         try:
-            await message.reply(schedule_text)
+            await message.answer(schedule_text)
             if user:
                 logging.info(
-                    f"📅 Запрос расписания от пользователя @{user.username} (ID: {user.id})"
+                    "📅 Запрос расписания от пользователя @%s (ID: %s)",
+                    user.username,
+                    user.id,
                 )
         except TelegramNetworkError:
             logging.warning(
-                f"⚠️ Сетевая ошибка при ответе на /schedule от @{user.username if user else 'unknown'}"
+                "⚠️ Сетевая ошибка при ответе на /schedule от @%s",
+                user.username if user else "unknown",
             )
 
     @router.message(Command("balance"))
@@ -840,19 +931,11 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        # Получаем сервисы из workflow_data
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-
         # Проверяем, является ли пользователь администратором
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
+        is_admin = await _is_message_admin(message)
 
         # Проверка rate limit
-        rate_limit_error = rate_limit_check(user, is_admin)
-        if rate_limit_error:
-            try:
-                await message.reply(rate_limit_error)
-            except TelegramNetworkError:
-                pass
+        if await _reply_if_rate_limited(message, user, is_admin):
             return
 
         transfer_details_note = "\n\nℹ️ Реквизиты для перевода — в описании группы."
@@ -918,18 +1001,24 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     f"{transfer_details_note}"
                 )
 
+        # Сводка для админа общая, личный баланс оставляем ответом на команду
+        send = message.answer if is_admin else message.reply
         try:
-            await message.reply(
+            await send(
                 text,
                 parse_mode="HTML",
-                link_preview_options=LinkPreviewOptions(is_disabled=True),
+                link_preview_options=_NO_LINK_PREVIEW,
             )
             logging.info(
-                f"💰 Запрос баланса от {'админа' if is_admin else 'пользователя'} @{user.username} (ID: {user.id})"
+                "💰 Запрос баланса от %s @%s (ID: %s)",
+                "админа" if is_admin else "пользователя",
+                user.username,
+                user.id,
             )
         except TelegramNetworkError:
             logging.warning(
-                f"⚠️ Сетевая ошибка при ответе на /balance от @{user.username if user else 'unknown'}"
+                "⚠️ Сетевая ошибка при ответе на /balance от @%s",
+                user.username if user else "unknown",
             )
 
     def _format_subs_add_usage() -> str:
@@ -1065,8 +1154,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 )
                 return
         else:
-            clean_query = search_query.lstrip("@")
-            players = find_player_by_name(clean_query)
+            players = find_player_by_name(search_query)
             if not players:
                 await safe_reply(
                     message,
@@ -1076,20 +1164,21 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 )
                 return
             if len(players) > 1:
-                keyboard = []
-                player_lines = []
-                for player in players[:10]:
-                    p_name = _format_player_choice_label(player)
-                    callback_data = f"subs_add_select:{poll_template_id}:{player['id']}"
-                    keyboard.append(
-                        [
-                            InlineKeyboardButton(
-                                text=p_name,
-                                callback_data=callback_data,
-                            )
-                        ]
-                    )
-                    player_lines.append(f"• {format_player_link(player)}")
+                candidates = players[:10]
+                keyboard = [
+                    [
+                        InlineKeyboardButton(
+                            text=_format_player_choice_label(player),
+                            callback_data=(
+                                f"subs_add_select:{poll_template_id}:{player['id']}"
+                            ),
+                        )
+                    ]
+                    for player in candidates
+                ]
+                player_lines = [
+                    f"• {format_player_link(player)}" for player in candidates
+                ]
 
                 hall_label = escape_html(_format_hall_label(hall))
                 await safe_reply(
@@ -1099,7 +1188,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     + "\n".join(player_lines),
                     reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
                     parse_mode="HTML",
-                    link_preview_options=LinkPreviewOptions(is_disabled=True),
+                    link_preview_options=_NO_LINK_PREVIEW,
                     action_name="reply to /subs add ambiguity",
                 )
                 return
@@ -1111,7 +1200,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             message,
             result_text,
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="reply to /subs add result",
         )
 
@@ -1122,18 +1211,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-
-        if not is_admin:
-            return
-
-        rate_limit_error = rate_limit_check(user, is_admin=True)
-        if rate_limit_error:
-            try:
-                await message.reply(rate_limit_error)
-            except TelegramNetworkError:
-                logging.warning("⚠️ Сетевая ошибка при отправке rate limit сообщения")
+        if not await _is_message_admin(message):
             return
 
         args = (message.text or "").split()
@@ -1163,16 +1241,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
 
         players = get_all_players()
         players_by_id = {p["id"]: p for p in players if "id" in p}
-
-        days_ru = {
-            "mon": "Понедельник",
-            "tue": "Вторник",
-            "wed": "Среда",
-            "thu": "Четверг",
-            "fri": "Пятница",
-            "sat": "Суббота",
-            "sun": "Воскресенье",
-            "*": "Ежедневно",
+        # Ключ сортировки считаем один раз на игрока, а не на каждую подписку
+        name_keys = {
+            user_id: str(p.get("fullname") or p.get("name") or user_id).lower()
+            for user_id, p in players_by_id.items()
         }
 
         def pick_day(template: PollTemplate) -> str:
@@ -1187,14 +1259,14 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             day_key = pick_day(template)
             day_to_polls.setdefault(day_key, []).append(template)
 
-        days_order = ["mon", "tue", "wed", "thu", "fri", "sat", "sun", "*"]
-        ordered_days = [d for d in days_order if d in day_to_polls]
-        ordered_days += sorted(d for d in day_to_polls.keys() if d not in days_order)
+        # SCHEDULE_DAY_NAMES перечисляет дни в порядке недели, "*" последним
+        ordered_days = [d for d in SCHEDULE_DAY_NAMES if d in day_to_polls]
+        ordered_days += sorted(d for d in day_to_polls if d not in SCHEDULE_DAY_NAMES)
 
         lines = ["📅 <b>Абонементы по дням</b>"]
 
         for day_key in ordered_days:
-            day_name = days_ru.get(day_key, day_key)
+            day_name = SCHEDULE_DAY_NAMES.get(day_key, day_key)
             lines.append(f"\n<b>{escape_html(day_name)}</b>")
 
             for template in day_to_polls.get(day_key, []):
@@ -1208,30 +1280,23 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     msk_hour = (hour + 3) % 24
                     time_text = f"{msk_hour:02d}:{minute:02d} МСК"
 
-                label = escape_html(poll_name)
-                if time_text:
-                    label = f"{label} ({time_text})"
-                if place:
-                    label = f"{label} — {escape_html(place)}"
-                if not _is_poll_enabled(template):
-                    label = f"{label} — ⏸️ выключен"
+                time_suffix = f" ({time_text})" if time_text else ""
+                place_suffix = f" — {escape_html(place)}" if place else ""
+                status_suffix = "" if _is_poll_enabled(template) else " — ⏸️ выключен"
+                name = escape_html(poll_name)
+                label = f"{name}{time_suffix}{place_suffix}{status_suffix}"
 
                 subs = template.get("subs") or []
-                subs_links: list[str] = []
-                subs_entries = []
-                for user_id in subs:
-                    if not isinstance(user_id, int):
-                        continue
-                    player = players_by_id.get(user_id)
-                    sort_key = (
-                        (player or {}).get("fullname")
-                        or (player or {}).get("name")
-                        or str(user_id)
-                    )
-                    subs_entries.append((str(sort_key).lower(), user_id, player))
-
-                for _, user_id, player in sorted(subs_entries, key=lambda x: x[0]):
-                    subs_links.append(format_player_link(player, user_id))
+                subs_entries = [
+                    (name_keys.get(user_id) or str(user_id), user_id)
+                    for user_id in subs
+                    if isinstance(user_id, int)
+                ]
+                subs_entries.sort(key=itemgetter(0))
+                subs_links = [
+                    format_player_link(players_by_id.get(user_id), user_id)
+                    for _, user_id in subs_entries
+                ]
 
                 if subs_links:
                     subs_text = ", ".join(subs_links)
@@ -1241,17 +1306,28 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 lines.append(f"{label}: {subs_text}")
 
         try:
+            # Длинный список разбиваем по строкам, чтобы не упереться в лимит 4096
+            first, *rest = _split_message_lines(lines)
             await message.reply(
-                "\n".join(lines),
+                first,
                 parse_mode="HTML",
-                link_preview_options=LinkPreviewOptions(is_disabled=True),
+                link_preview_options=_NO_LINK_PREVIEW,
             )
+            for chunk in rest:
+                await message.answer(
+                    chunk,
+                    parse_mode="HTML",
+                    link_preview_options=_NO_LINK_PREVIEW,
+                )
             logging.info(
-                f"📋 Запрос абонементов по дням от админа @{user.username} (ID: {user.id})"
+                "📋 Запрос абонементов по дням от админа @%s (ID: %s)",
+                user.username,
+                user.id,
             )
         except TelegramNetworkError:
             logging.warning(
-                f"⚠️ Сетевая ошибка при ответе на /subs от @{user.username if user else 'unknown'}"
+                "⚠️ Сетевая ошибка при ответе на /subs от @%s",
+                user.username if user else "unknown",
             )
 
     @router.message(Command("stats"))
@@ -1261,9 +1337,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-        if not is_admin:
+        if not await _is_message_admin(message):
             return
 
         args = (message.text or "").split()
@@ -1358,7 +1432,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 if identifier.isdigit():
                     target_user_id = int(identifier)
                 else:
-                    players = find_player_by_name(identifier)
+                    players = find_player_by_name(args[2])
                     if not players:
                         await safe_reply(
                             message,
@@ -1414,19 +1488,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             message,
             text,
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="reply to /stats",
         )
 
-    async def _is_message_admin(message: Message) -> bool:
-        """Проверяет права администратора для message-команды."""
-        user = message.from_user
-        if user is None:
-            return False
-
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        return await admin_service.is_admin(bot, user, message.chat.id)
-
     def _get_hall_by_id(poll_template_id: int) -> PollTemplate | None:
         """Возвращает шаблон зала по ID."""
         return next(
@@ -1450,7 +1515,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
     async def _refresh_hall_scheduler() -> None:
         """Обновляет планировщик после изменения залов."""
         scheduler = dp.workflow_data["scheduler"]
-        bot_state_service: BotStateService = dp.workflow_data["bot_state_service"]
         poll_service: PollService = dp.workflow_data["poll_service"]
         refresh_scheduler(scheduler, bot, bot_state_service, poll_service)
 
@@ -1849,7 +1913,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         user = callback_query.from_user
         if user is None or callback_query.message is None:
             return
-        admin_service: AdminService = dp.workflow_data["admin_service"]
         is_admin = await admin_service.is_admin(
             bot, user, callback_query.message.chat.id
         )
@@ -1941,9 +2004,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-        if not is_admin:
+        if not await _is_message_admin(message):
             return
 
         poll_service: PollService = dp.workflow_data["poll_service"]
@@ -1962,7 +2023,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             return
 
-        bot_state_service: BotStateService = dp.workflow_data["bot_state_service"]
         chat_id = bot_state_service.get_chat_id()
         new_chat_id = await poll_service.open_monthly_subscription_poll(
             bot,
@@ -1985,9 +2045,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-        if not is_admin:
+        if not await _is_message_admin(message):
             return
 
         poll_service: PollService = dp.workflow_data["poll_service"]
@@ -2014,13 +2072,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        # Получаем сервисы из workflow_data
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-
-        # Проверяем, является ли пользователь администратором
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-
-        if not is_admin:
+        if not await _is_message_admin(message):
             return
 
         try:
@@ -2043,13 +2095,13 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             else:
                 info_text += "\n✅ All update types allowed"
 
-            await safe_reply(
+            await safe_answer(
                 message,
                 info_text,
-                action_name="reply to /webhookinfo",
+                action_name="answer to /webhookinfo",
             )
             logging.info(
-                f"🔍 Webhook info запрошен админом @{user.username} (ID: {user.id})"
+                "🔍 Webhook info запрошен админом @%s (ID: %s)", user.username, user.id
             )
         except Exception as e:
             await safe_reply(
@@ -2057,13 +2109,13 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 f"❌ Ошибка получения webhook info: {e}",
                 action_name="reply to /webhookinfo error",
             )
-            logging.error(f"❌ Ошибка при получении webhook info: {e}")
+            logging.error("❌ Ошибка при получении webhook info: %s", e)
 
     async def _resolve_target(
-        message: Message, args: list[str], callback_prefix: str
+        message: Message, rest: str, callback_prefix: str
     ) -> tuple[int | None, int, str] | None:
         """
-        Определяет целевого игрока и сумму из аргументов команды.
+        Определяет целевого игрока и сумму из текста команды после её имени.
 
         Возвращает (target_user_id, amount, target_name) если определено,
         или None если показана клавиатура / сообщение об ошибке.
@@ -2085,10 +2137,9 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             target_name = (
                 target_user.full_name or target_user.username or f"ID: {target_user_id}"
             )
-            if len(args) > 1:
-                try:
-                    amount = int(args[1])
-                except ValueError:
+            if rest:
+                parsed_amount = _parse_amount(rest.split(maxsplit=1)[0])
+                if parsed_amount is None:
                     await safe_reply(
                         message,
                         "❌ Ошибка: сумма должна быть числом.\nПример: <code>/pay 500</code>",
@@ -2096,6 +2147,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                         action_name="reply to direct amount parse error",
                     )
                     return None
+                amount = parsed_amount
             else:
                 await safe_reply(
                     message,
@@ -2105,75 +2157,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 )
                 return None
         # 2. Если указаны аргументы (Имя/ID/@username Сумма)
-        elif len(args) >= 3:
-            try:
-                amount = int(args[-1])
-                search_query = " ".join(args[1:-1])
-
-                # Проверяем, не является ли запрос ID игрока
-                if search_query.isdigit():
-                    target_user_id = int(search_query)
-                    player = get_player_balance(target_user_id)
-                    if player:
-                        target_name = (
-                            player["fullname"]
-                            or player["name"]
-                            or f"ID: {target_user_id}"
-                        )
-                    else:
-                        await safe_reply(
-                            message,
-                            f"❌ Игрок с ID {target_user_id} не найден.",
-                            action_name="reply to missing player by id",
-                        )
-                        return None
-                else:
-                    # Поиск по имени или @username (убираем @ если есть)
-                    clean_query = search_query.lstrip("@")
-                    players = find_player_by_name(clean_query)
-                    if not players:
-                        await safe_reply(
-                            message,
-                            f"❌ Игрок '{search_query}' не найден.",
-                            action_name="reply to missing player by name",
-                        )
-                        return None
-                    if len(players) > 1:
-                        keyboard = []
-                        player_lines = []
-                        for p in players[:10]:  # Ограничим 10 игроками
-                            p_name = _format_player_choice_label(p)
-                            callback_data = f"{callback_prefix}:{p['id']}:{amount}"
-                            keyboard.append(
-                                [
-                                    InlineKeyboardButton(
-                                        text=p_name, callback_data=callback_data
-                                    )
-                                ]
-                            )
-                            player_lines.append(
-                                f"• {format_player_link(p)} — <b>{int(p.get('balance', 0) or 0)} ₽</b>"
-                            )
-
-                        reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
-                        players_list = "\n".join(player_lines)
-                        await safe_reply(
-                            message,
-                            f"❓ Найдено несколько игроков ({len(players)}). Выберите нужного:\n\n{players_list}",
-                            reply_markup=reply_markup,
-                            parse_mode="HTML",
-                            link_preview_options=LinkPreviewOptions(is_disabled=True),
-                            action_name="reply to ambiguous player search",
-                        )
-                        return None
-
-                    target_user_id = players[0]["id"]
-                    target_name = (
-                        players[0]["fullname"]
-                        or players[0]["name"]
-                        or f"ID: {target_user_id}"
-                    )
-            except ValueError:
+        elif len(query_and_amount := rest.rsplit(maxsplit=1)) == 2:
+            search_query, amount_text = query_and_amount
+            parsed_amount = _parse_amount(amount_text)
+            if parsed_amount is None:
                 await safe_reply(
                     message,
                     "❌ Ошибка: сумма должна быть числом в конце команды.\nПример: <code>/pay Иван 500</code>",
@@ -2181,6 +2168,68 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     action_name="reply to trailing amount parse error",
                 )
                 return None
+            amount = parsed_amount
+
+            # Проверяем, не является ли запрос ID игрока
+            if search_query.isdecimal():
+                target_user_id = int(search_query)
+                player = get_player_balance(target_user_id)
+                if player:
+                    target_name = (
+                        player["fullname"]
+                        or player["name"]
+                        or f"ID: {target_user_id}"
+                    )
+                else:
+                    await safe_reply(
+                        message,
+                        f"❌ Игрок с ID {target_user_id} не найден.",
+                        action_name="reply to missing player by id",
+                    )
+                    return None
+            else:
+                # Поиск по имени или @username
+                players = find_player_by_name(search_query)
+                if not players:
+                    await safe_reply(
+                        message,
+                        f"❌ Игрок '{search_query}' не найден.",
+                        action_name="reply to missing player by name",
+                    )
+                    return None
+                if len(players) > 1:
+                    candidates = players[:10]  # Ограничим 10 игроками
+                    reply_markup = InlineKeyboardMarkup(
+                        inline_keyboard=[
+                            [
+                                InlineKeyboardButton(
+                                    text=_format_player_choice_label(p),
+                                    callback_data=f"{callback_prefix}:{p['id']}:{amount}",
+                                )
+                            ]
+                            for p in candidates
+                        ]
+                    )
+                    players_list = "\n".join(
+                        f"• {format_player_link(p)} — <b>{int(p.get('balance', 0) or 0)} ₽</b>"
+                        for p in candidates
+                    )
+                    await safe_reply(
+                        message,
+                        f"❓ Найдено несколько игроков ({len(players)}). Выберите нужного:\n\n{players_list}",
+                        reply_markup=reply_markup,
+                        parse_mode="HTML",
+                        link_preview_options=_NO_LINK_PREVIEW,
+                        action_name="reply to ambiguous player search",
+                    )
+                    return None
+
+                target_user_id = players[0]["id"]
+                target_name = (
+                    players[0]["fullname"]
+                    or players[0]["name"]
+                    or f"ID: {target_user_id}"
+                )
         else:
             return (None, 0, "")
 
@@ -2193,24 +2242,21 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-
-        if not is_admin:
+        if message.text is None:
             return
 
-        if message.text is None:
+        if not await _is_message_admin(message):
             return
 
-        args = message.text.split()
+        args = message.text.split(maxsplit=1)
+        rest = args[1].strip() if len(args) > 1 else ""
 
         # Специальный случай: /pay Оплата зала
-        rest_text = " ".join(args[1:]).strip().lower() if len(args) > 1 else ""
-        if rest_text == "оплата зала":
+        if rest.lower() == "оплата зала":
             await _handle_hall_payment(message, user)
             return
 
-        result = await _resolve_target(message, args, "pay_select")
+        result = await _resolve_target(message, rest, "pay_select")
         if result is None:
             return
 
@@ -2234,11 +2280,11 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         admin_name = f"@{user.username}" if user.username else f"ID:{user.id}"
         description = f"Оплата (admin: {admin_name})"
 
-        if update_player_and_fund_balance_atomic(target_user_id, amount, description):
-            new_balance_data = get_player_balance(target_user_id)
-            new_balance = (
-                new_balance_data["balance"] if new_balance_data else "неизвестно"
-            )
+        new_balance_data = update_player_and_fund_balance_atomic(
+            target_user_id, amount, description
+        )
+        if new_balance_data:
+            new_balance = new_balance_data["balance"]
             fund = get_fund_balance()
             player_link = format_player_link(new_balance_data, target_user_id)
             try:
@@ -2247,10 +2293,15 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     f"💰 Текущий баланс: <b>{new_balance} ₽</b>\n"
                     f"🏦 Касса: <b>{fund} ₽</b>",
                     parse_mode="HTML",
-                    link_preview_options=LinkPreviewOptions(is_disabled=True),
+                    link_preview_options=_NO_LINK_PREVIEW,
                 )
                 logging.info(
-                    f"💰 Админ @{user.username} (ID: {user.id}) изменил баланс {target_name} (ID: {target_user_id}) на {amount}"
+                    "💰 Админ @%s (ID: %s) изменил баланс %s (ID: %s) на %s",
+                    user.username,
+                    user.id,
+                    target_name,
+                    target_user_id,
+                    amount,
                 )
             except TelegramNetworkError:
                 pass
@@ -2306,7 +2357,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             "\n".join(lines),
             reply_markup=reply_markup,
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="reply to hall payment selection",
         )
 
@@ -2317,17 +2368,15 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-
-        if not is_admin:
+        if not await _is_message_admin(message):
             return
 
         if message.text is None:
             return
 
-        args = message.text.split()
-        result = await _resolve_target(message, args, "restore_select")
+        args = message.text.split(maxsplit=1)
+        rest = args[1].strip() if len(args) > 1 else ""
+        result = await _resolve_target(message, rest, "restore_select")
         if result is None:
             return
 
@@ -2350,11 +2399,11 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         admin_name = f"@{user.username}" if user.username else f"ID:{user.id}"
         description = f"Восстановление (admin: {admin_name})"
 
-        if update_player_and_transaction_atomic(target_user_id, amount, description):
-            new_balance_data = get_player_balance(target_user_id)
-            new_balance = (
-                new_balance_data["balance"] if new_balance_data else "неизвестно"
-            )
+        new_balance_data = update_player_and_transaction_atomic(
+            target_user_id, amount, description
+        )
+        if new_balance_data:
+            new_balance = new_balance_data["balance"]
             player_link = format_player_link(new_balance_data, target_user_id)
             try:
                 await message.reply(
@@ -2362,10 +2411,15 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     f"💰 Текущий баланс: <b>{new_balance} ₽</b>\n"
                     f"<i>Касса не изменена.</i>",
                     parse_mode="HTML",
-                    link_preview_options=LinkPreviewOptions(is_disabled=True),
+                    link_preview_options=_NO_LINK_PREVIEW,
                 )
                 logging.info(
-                    f"🔄 Админ @{user.username} (ID: {user.id}) восстановил баланс {target_name} (ID: {target_user_id}) на {amount}"
+                    "🔄 Админ @%s (ID: %s) восстановил баланс %s (ID: %s) на %s",
+                    user.username,
+                    user.id,
+                    target_name,
+                    target_user_id,
+                    amount,
                 )
             except TelegramNetworkError:
                 pass
@@ -2383,33 +2437,29 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-
-        if not is_admin:
+        if not await _is_message_admin(message):
             return
 
         if message.text is None:
             return
 
-        args = message.text.split()
+        args = message.text.split(maxsplit=1)
 
         # 1. Ответ на сообщение — показать одного игрока
         if message.reply_to_message and message.reply_to_message.from_user:
             target_user = message.reply_to_message.from_user
-            ensure_player(
+            p = ensure_player(
                 user_id=target_user.id,
                 name=target_user.username,
                 fullname=target_user.full_name,
             )
-            p = get_player_info(target_user.id)
             if p:
                 text = _format_player_detail(p)
                 await safe_reply(
                     message,
                     text,
                     parse_mode="HTML",
-                    link_preview_options=LinkPreviewOptions(is_disabled=True),
+                    link_preview_options=_NO_LINK_PREVIEW,
                     action_name="reply to /player by reply",
                 )
             else:
@@ -2422,7 +2472,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
 
         # 2. Есть аргумент — поиск одного игрока по имени, @username или ID
         if len(args) >= 2:
-            search_query = " ".join(args[1:]).strip()
+            search_query = args[1].strip()
             if not search_query:
                 pass
             elif search_query.isdigit():
@@ -2434,7 +2484,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                         message,
                         text,
                         parse_mode="HTML",
-                        link_preview_options=LinkPreviewOptions(is_disabled=True),
+                        link_preview_options=_NO_LINK_PREVIEW,
                         action_name="reply to /player by id",
                     )
                 else:
@@ -2445,8 +2495,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     )
                 return
             else:
-                clean_query = search_query.lstrip("@")
-                players = find_player_by_name(clean_query)
+                players = find_player_by_name(search_query)
                 if not players:
                     await safe_reply(
                         message,
@@ -2455,47 +2504,38 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                     )
                     return
                 if len(players) == 1:
-                    p = get_player_info(players[0]["id"])
-                    if p:
-                        text = _format_player_detail(p)
-                        await safe_reply(
-                            message,
-                            text,
-                            parse_mode="HTML",
-                            link_preview_options=LinkPreviewOptions(is_disabled=True),
-                            action_name="reply to /player single match",
-                        )
-                    else:
-                        await safe_reply(
-                            message,
-                            "❌ Не удалось получить данные игрока.",
-                            action_name="reply to /player single missing data",
-                        )
+                    # Поиск уже вернул все поля карточки, повторный запрос не нужен
+                    await safe_reply(
+                        message,
+                        _format_player_detail(players[0]),
+                        parse_mode="HTML",
+                        link_preview_options=_NO_LINK_PREVIEW,
+                        action_name="reply to /player single match",
+                    )
                     return
                 # Несколько совпадений — клавиатура выбора
-                keyboard = []
-                player_lines = []
-                for p in players[:10]:
-                    p_name = _format_player_choice_label(p)
-                    keyboard.append(
+                candidates = players[:10]
+                reply_markup = InlineKeyboardMarkup(
+                    inline_keyboard=[
                         [
                             InlineKeyboardButton(
-                                text=p_name,
+                                text=_format_player_choice_label(p),
                                 callback_data=f"player_select:{p['id']}",
                             )
                         ]
-                    )
-                    player_lines.append(
-                        f"• {format_player_link(p)} — <b>{int(p.get('balance', 0) or 0)} ₽</b>"
-                    )
-                reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
-                players_list = "\n".join(player_lines)
+                        for p in candidates
+                    ]
+                )
+                players_list = "\n".join(
+                    f"• {format_player_link(p)} — <b>{int(p.get('balance', 0) or 0)} ₽</b>"
+                    for p in candidates
+                )
                 await safe_reply(
                     message,
                     f"❓ Найдено несколько игроков ({len(players)}). Выберите:\n\n{players_list}",
                     reply_markup=reply_markup,
                     parse_mode="HTML",
-                    link_preview_options=LinkPreviewOptions(is_disabled=True),
+                    link_preview_options=_NO_LINK_PREVIEW,
                     action_name="reply to /player ambiguity",
                 )
                 return
@@ -2510,7 +2550,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             return
 
-        lines = ["👥 <b>Игроки</b> ({}) — кратко:\n".format(len(all_players))]
+        lines = [f"👥 <b>Игроки</b> ({len(all_players)}) — кратко:\n"]
+        # Строки сверх лимита сообщения не форматируем; запас — под строку «и ещё»
+        budget = MESSAGE_CHUNK_LIMIT - 64
+        size = len(lines[0])
         poll_templates = get_poll_templates()
         for p in all_players:
             link = format_player_link(p)
@@ -2520,19 +2563,22 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             ball = "да" if p.get("ball_donate") else "нет"
             guest = ", гость" if p.get("is_guest") else ""
-            lines.append(
+            line = (
                 f"• {link} — {balance} ₽, абонемент: {subscriptions}, мяч: {ball}{guest}"
             )
+            size += len(line) + 1
+            if size > budget:
+                break
+            lines.append(line)
         text = "\n".join(lines)
-        if len(text) > 4000:
-            text = (
-                "\n".join(lines[:1] + lines[1:81]) + "\n\n… и ещё (показаны первые 80)."
-            )
+        shown = len(lines) - 1
+        if shown < len(all_players):
+            text += f"\n\n… и ещё (показаны первые {shown})."
         await safe_reply(
             message,
             text,
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="reply to /player list",
         )
 
@@ -2594,7 +2640,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 return None
             return player_id
 
-        players = find_player_by_name(search_query.lstrip("@"))
+        players = find_player_by_name(search_query)
         if not players:
             await safe_reply(
                 message,
@@ -2607,19 +2653,18 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if len(players) == 1:
             return int(players[0]["id"])
 
-        keyboard = []
-        player_lines = []
         raw_value = "1" if is_guest else "0"
-        for player in players[:10]:
-            keyboard.append(
-                [
-                    InlineKeyboardButton(
-                        text=_format_player_choice_label(player),
-                        callback_data=f"guest_set:{raw_value}:{player['id']}",
-                    )
-                ]
-            )
-            player_lines.append(f"• {format_player_link(player)}")
+        candidates = players[:10]
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    text=_format_player_choice_label(player),
+                    callback_data=f"guest_set:{raw_value}:{player['id']}",
+                )
+            ]
+            for player in candidates
+        ]
+        player_lines = [f"• {format_player_link(player)}" for player in candidates]
 
         await safe_reply(
             message,
@@ -2627,7 +2672,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             + "\n".join(player_lines),
             reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="reply to /guest ambiguity",
         )
         return None
@@ -2678,7 +2723,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 message,
                 "\n".join(lines),
                 parse_mode="HTML",
-                link_preview_options=LinkPreviewOptions(is_disabled=True),
+                link_preview_options=_NO_LINK_PREVIEW,
                 action_name="reply to /guest list",
             )
             return
@@ -2702,7 +2747,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             message,
             _set_guest_status_result_text(target_user_id, is_guest),
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="reply to /guest set result",
         )
 
@@ -2713,9 +2758,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if user is None:
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
-        is_admin = await admin_service.is_admin(bot, user, message.chat.id)
-        if not is_admin:
+        if not await _is_message_admin(message):
             return
 
         if message.text is None:
@@ -2739,8 +2782,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             elif search_query.isdigit():
                 target_user_id = int(search_query)
             else:
-                clean_query = search_query.lstrip("@")
-                players = find_player_by_name(clean_query)
+                players = find_player_by_name(search_query)
                 if not players:
                     await safe_reply(
                         message,
@@ -2757,7 +2799,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                         message,
                         f"❌ Найдено несколько игроков. Уточните запрос:\n{matches}",
                         parse_mode="HTML",
-                        link_preview_options=LinkPreviewOptions(is_disabled=True),
+                        link_preview_options=_NO_LINK_PREVIEW,
                         action_name="reply to /ball_donate ambiguity",
                     )
                     return
@@ -2794,11 +2836,10 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             f"✅ Для игрока {player_link} донат мяча {status_text}.\n"
             f"🏐 Донат: <b>{ball_text}</b>",
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="reply to /ball_donate success",
         )
 
-    @router.callback_query(lambda c: c.data and c.data.startswith("guest_set:"))
     async def process_guest_set(callback_query: CallbackQuery):
         """Обработка выбора игрока для /guest add/remove."""
         user = callback_query.from_user
@@ -2811,7 +2852,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
         is_admin = await admin_service.is_admin(
             bot, user, callback_query.message.chat.id
         )
@@ -2848,7 +2888,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             callback_query.message,
             _set_guest_status_result_text(player_id, is_guest),
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="edit guest_set result",
         )
         await safe_answer_callback(
@@ -2856,7 +2896,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             action_name="answer guest_set success",
         )
 
-    @router.callback_query(lambda c: c.data and c.data.startswith("subs_add_select:"))
     async def process_subs_add_select(callback_query: CallbackQuery):
         """Обработка выбора игрока для /subs add."""
         user = callback_query.from_user
@@ -2878,7 +2917,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
         is_admin = await admin_service.is_admin(
             bot, user, callback_query.message.chat.id
         )
@@ -2916,7 +2954,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             callback_query.message,
             result_text,
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="edit subs_add_select result",
         )
         await safe_answer_callback(
@@ -2924,7 +2962,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             action_name="answer subs_add_select success",
         )
 
-    @router.callback_query(lambda c: c.data and c.data.startswith("player_select:"))
     async def process_player_select(callback_query: CallbackQuery):
         """Обработка выбора игрока из списка для просмотра информации."""
         user = callback_query.from_user
@@ -2946,7 +2983,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
         is_admin = await admin_service.is_admin(
             bot, user, callback_query.message.chat.id
         )
@@ -2995,7 +3031,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             callback_query.message,
             text,
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="edit player_select result",
         )
         await safe_answer_callback(
@@ -3028,7 +3064,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
         is_admin = await admin_service.is_admin(
             bot, user, callback_query.message.chat.id
         )
@@ -3073,19 +3108,16 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         )
 
         if update_fund:
-            success = update_player_and_fund_balance_atomic(
+            new_balance_data = update_player_and_fund_balance_atomic(
                 target_user_id, amount, description
             )
         else:
-            success = update_player_and_transaction_atomic(
+            new_balance_data = update_player_and_transaction_atomic(
                 target_user_id, amount, description
             )
 
-        if success:
-            new_balance_data = get_player_balance(target_user_id)
-            new_balance = (
-                new_balance_data["balance"] if new_balance_data else "неизвестно"
-            )
+        if new_balance_data:
+            new_balance = new_balance_data["balance"]
             player_link = format_player_link(new_balance_data, target_user_id)
 
             if update_fund:
@@ -3106,7 +3138,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 callback_query.message,
                 result_text,
                 parse_mode="HTML",
-                link_preview_options=LinkPreviewOptions(is_disabled=True),
+                link_preview_options=_NO_LINK_PREVIEW,
                 action_name="edit balance_select result",
             )
 
@@ -3116,8 +3148,12 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             action = "изменил" if update_fund else "восстановил"
             logging.info(
-                f"💰 Админ @{user.username} (ID: {user.id}) {action} баланс через меню: "
-                f"ID={target_user_id}, сумма={amount}"
+                "💰 Админ @%s (ID: %s) %s баланс через меню: ID=%s, сумма=%s",
+                user.username,
+                user.id,
+                action,
+                target_user_id,
+                amount,
             )
         else:
             await safe_answer_callback(
@@ -3127,17 +3163,14 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
                 action_name="answer balance_select update failure",
             )
 
-    @router.callback_query(lambda c: c.data and c.data.startswith("pay_select:"))
     async def process_pay_select(callback_query: CallbackQuery):
         """Обработка выбора игрока из списка для изменения баланса."""
         await _process_balance_select(callback_query, update_fund=True)
 
-    @router.callback_query(lambda c: c.data and c.data.startswith("restore_select:"))
     async def process_restore_select(callback_query: CallbackQuery):
         """Обработка выбора игрока из списка для восстановления баланса."""
         await _process_balance_select(callback_query, update_fund=False)
 
-    @router.callback_query(lambda c: c.data and c.data.startswith("hall_pay:"))
     async def process_hall_pay(callback_query: CallbackQuery):
         """Обработка выбора зала для оплаты."""
         user = callback_query.from_user
@@ -3159,7 +3192,6 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             )
             return
 
-        admin_service: AdminService = dp.workflow_data["admin_service"]
         is_admin = await admin_service.is_admin(
             bot, user, callback_query.message.chat.id
         )
@@ -3263,7 +3295,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             callback_query.message,
             result_text,
             parse_mode="HTML",
-            link_preview_options=LinkPreviewOptions(is_disabled=True),
+            link_preview_options=_NO_LINK_PREVIEW,
             action_name="edit hall_pay result",
         )
 
@@ -3272,10 +3304,37 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             action_name="answer hall_pay success",
         )
         logging.info(
-            f"🏟 Админ @{user.username} (ID: {user.id}) оплатил зал {poll_name} за {month}: {monthly_rent}₽ "
-            f"(cost_per_game={cost_per_game}, games={games_in_month})"
+            "🏟 Админ @%s (ID: %s) оплатил зал %s за %s: %s₽ (cost_per_game=%s, "
+            "games=%s)",
+            user.username,
+            user.id,
+            poll_name,
+            month,
+            monthly_rent,
+            cost_per_game,
+            games_in_month,
         )
 
+    # Callback-и вида "prefix:..." маршрутизируются одним фильтром по словарю
+    prefixed_callback_handlers: dict[
+        str, Callable[[CallbackQuery], Awaitable[None]]
+    ] = {
+        "guest_set": process_guest_set,
+        "subs_add_select": process_subs_add_select,
+        "player_select": process_player_select,
+        "pay_select": process_pay_select,
+        "restore_select": process_restore_select,
+        "hall_pay": process_hall_pay,
+    }
+
+    @router.callback_query(
+        lambda c: _callback_prefix(c.data) in prefixed_callback_handlers
+    )
+    async def dispatch_prefixed_callback(callback_query: CallbackQuery) -> None:
+        """Передаёт callback обработчику, выбранному по префиксу data."""
+        handler = prefixed_callback_handlers[_callback_prefix(callback_query.data)]
+        await handler(callback_query)
+
     @router.poll_answer()
     async def handle_poll_answer(
         poll_answer: PollAnswer, event_update: Update | None = None
@@ -3288,7 +3347,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
 
         if user is None:
             logging.error(
-                f"❌ Получен ответ на опрос {poll_id} без информации о пользователе"
+                "❌ Получен ответ на опрос %s без информации о пользователе", poll_id
             )
             return
 
@@ -3296,8 +3355,13 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         ensure_player(user_id=user.id, name=user.username, fullname=user.full_name)
 
         logging.info(
-            f"🗳️ Получен ответ от пользователя @{user.username or 'unknown'} "
-            f"(ID: {user.id}) на опрос {poll_id}: вариант {selected}, update_id: {update_id}"
+            "🗳️ Получен ответ от пользователя @%s (ID: %s) на опрос %s: вариант %s, "
+            "update_id: %s",
+            user.username or "unknown",
+            user.id,
+            poll_id,
+            selected,
+            update_id,
         )
 
         # Получаем сервис из workflow_data
@@ -3313,7 +3377,7 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         if data.kind == "monthly_subscription":
             data.monthly_votes[user.id] = selected
             save_monthly_vote(poll_id, user.id, selected)
-            poll_service.persist_state()
+            poll_service.schedule_persist_state()
             return
 
         voted_yes = 0 in selected  # Да
@@ -3334,7 +3398,9 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
             is_guest=is_guest,
         )
         logging.debug(
-            f"Обновленный список голосующих за опрос {poll_id}: {len(yes_voters)} чел."
+            "Обновленный список голосующих за опрос %s: %s чел.",
+            poll_id,
+            len(yes_voters),
         )
 
         # Отменяем предыдущую задачу обновления
@@ -3343,12 +3409,29 @@ def register_handlers(dp: Dispatcher, bot: Bot) -> None:
         # Создаём новую задачу обновления с задержкой
         poll_service.create_update_task(poll_id, bot)
 
-        # Сохраняем текущее состояние опросов для восстановления после перезапуска
-        poll_service.persist_state()
+        # Сохраняем текущее состояние опросов для восстановления после перезапуска;
+        # серия голосов подряд объединяется в одну запись
+        poll_service.schedule_persist_state()
+
+    @router.chat_member()
+    async def handle_chat_member(event: ChatMemberUpdated) -> None:
+        """Сбрасывает кэш администраторов при назначении или снятии админа."""
+        admin_statuses = {ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR}
+        was_admin = event.old_chat_member.status in admin_statuses
+        is_admin = event.new_chat_member.status in admin_statuses
+        if was_admin == is_admin:
+            return
+
+        admin_service.invalidate_cache(event.chat.id)
 
     @router.message()
     async def log_any_message(message: Message) -> None:
         """Логирует все входящие сообщения и их message_id."""
+        # Обработчик вызывается на каждое сообщение: без DEBUG ничего не готовим,
+        # в том числе вычисляемый content_type
+        if not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return
+
         user = message.from_user
         username = f"@{user.username}" if user and user.username else "unknown"
         user_id = user.id if user else "unknown"
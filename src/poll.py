@@ -317,10 +317,11 @@ def sort_voters_by_update_id(
     """
     # Сначала идут игроки с подпиской, затем остальные.
     # Внутри каждой группы сохраняется порядок голосования (по update_id).
+    sub_ids = set(subs or ())
     return sorted(
         voters,
         key=lambda v: (
-            v.id not in (subs or []),
+            v.id not in sub_ids,
             v.update_id,
             v.id,
         ),
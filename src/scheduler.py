@@ -19,6 +19,7 @@ from .db import (
     get_open_game_by_template_id,
     get_open_monthly_game,
     get_poll_templates,
+    optimize_db,
 )
 from .services import BotStateService, PollService
 from .types import PollTemplate
@@ -156,6 +157,14 @@ def setup_scheduler(
         name="Бэкапы (очистка)",
         replace_existing=True,
     )
+    # Периодически обновляем статистику планировщика запросов SQLite
+    scheduler.add_job(
+        optimize_db,
+        trigger=CronTrigger(hour="*/6", minute=30, timezone="UTC"),
+        id="db_optimize",
+        name="БД (PRAGMA optimize)",
+        replace_existing=True,
+    )
 
     # Загружаем шаблоны опросов из БД
     poll_templates = get_poll_templates()
@@ -120,31 +120,41 @@ class AdminService:
             target_chat_id = chat_id
 
         async with self._cache_lock:
-            admin_ids = await self._fetch_admins(bot, target_chat_id)
-            
-            if admin_ids:
-                # Успешная загрузка — обновляем кэш
-                self._admin_cache[target_chat_id] = admin_ids
-                self._cache_updated_at[target_chat_id] = time.time()
-                logging.info(
-                    f"🔄 Кэш администраторов обновлён для чата {target_chat_id} "
-                    f"({len(admin_ids)} администраторов)"
-                )
-            elif target_chat_id in self._admin_cache:
-                # Ошибка загрузки — сохраняем предыдущий кэш
-                logging.warning(
-                    "⚠️ Не удалось загрузить администраторов для чата %s. "
-                    "Используем предыдущий кэш (%s пользователей), "
-                    "но не продлеваем TTL, чтобы повторить запрос при следующей проверке.",
-                    target_chat_id,
-                    len(self._admin_cache[target_chat_id]),
-                )
-            else:
-                # Ошибка загрузки и нет предыдущего кэша
-                logging.warning(
-                    "⚠️ Не удалось загрузить администраторов для чата %s, кэш пуст.",
-                    target_chat_id,
-                )
+            await self._refresh_cache_locked(bot, target_chat_id)
+
+    async def _refresh_cache_locked(self, bot: Bot, target_chat_id: int) -> None:
+        """
+        Загружает администраторов и обновляет кэш. Вызывается под _cache_lock.
+
+        Args:
+            bot: Экземпляр бота
+            target_chat_id: ID чата, для которого обновляется кэш
+        """
+        admin_ids = await self._fetch_admins(bot, target_chat_id)
+
+        if admin_ids:
+            # Успешная загрузка — обновляем кэш
+            self._admin_cache[target_chat_id] = admin_ids
+            self._cache_updated_at[target_chat_id] = time.time()
+            logging.info(
+                f"🔄 Кэш администраторов обновлён для чата {target_chat_id} "
+                f"({len(admin_ids)} администраторов)"
+            )
+        elif target_chat_id in self._admin_cache:
+            # Ошибка загрузки — сохраняем предыдущий кэш
+            logging.warning(
+                "⚠️ Не удалось загрузить администраторов для чата %s. "
+                "Используем предыдущий кэш (%s пользователей), "
+                "но не продлеваем TTL, чтобы повторить запрос при следующей проверке.",
+                target_chat_id,
+                len(self._admin_cache[target_chat_id]),
+            )
+        else:
+            # Ошибка загрузки и нет предыдущего кэша
+            logging.warning(
+                "⚠️ Не удалось загрузить администраторов для чата %s, кэш пуст.",
+                target_chat_id,
+            )
 
     async def is_admin(self, bot: Bot, user: User, chat_id: int | None = None) -> bool:
         """
@@ -165,9 +175,12 @@ class AdminService:
         else:
             target_chat_id = chat_id
 
-        # Проверяем кэш
+        # Проверяем кэш; повторная проверка под lock не даёт одновременным
+        # командам запросить getChatAdministrators несколько раз
         if not self._is_cache_valid(target_chat_id):
-            await self.refresh_cache(bot, target_chat_id)
+            async with self._cache_lock:
+                if not self._is_cache_valid(target_chat_id):
+                    await self._refresh_cache_locked(bot, target_chat_id)
 
         # Проверяем наличие в кэше
         admin_ids = self._admin_cache.get(target_chat_id, set())
@@ -30,12 +30,11 @@ from ..config import (
 )
 from ..db import (
     POLL_STATE_KEY,
-    add_transaction,
+    charge_player_atomic,
     close_game,
     count_player_regular_participations,
     create_backup,
     create_game,
-    ensure_player,
     get_fund_balance,
     get_game,
     get_open_game_by_template_id,
@@ -52,7 +51,6 @@ from ..db import (
     save_state,
     update_game_info_message,
     update_game_last_info_text,
-    update_player_balance,
 )
 from ..poll import PollData, PollRoster, VoterInfo, build_regular_poll_roster
 from ..types import (
@@ -90,6 +88,7 @@ DISCOUNTED_MIN_SUB_PRICE = 100  # Абсолютный минимум при в
 MAX_SUB_PRICE = 500  # Максимальная цена абонемента за 1 зал
 DEFAULT_SUB_PRICE = 450  # Цена по умолчанию, если нет подписчиков
 PLAYERS_LIST_UPDATE_DELAY_SECONDS = 5  # Задержка перед обновлением списка игроков
+POLL_STATE_PERSIST_DELAY_SECONDS = 0.25  # Окно объединения записей состояния опросов
 GUEST_FREE_FIRST_GAMES = 4
 
 
@@ -317,6 +316,7 @@ class PollService:
         """Инициализация сервиса опросов."""
         self._poll_data: dict[str, PollData] = {}
         self._update_tasks: dict[str, Task[None] | None] = {}
+        self._persist_handle: asyncio.TimerHandle | None = None
 
     async def _safe_send_message(
         self,
@@ -546,8 +546,30 @@ class PollService:
             return chat_id
         return await self.send_poll_spec(bot, chat_id, spec, bot_enabled)
 
+    def schedule_persist_state(self) -> None:
+        """
+        Запланировать отложенное сохранение состояния опросов.
+
+        Серия голосов за POLL_STATE_PERSIST_DELAY_SECONDS превращается в одну
+        запись: состояние сериализуется в момент сохранения, поэтому в БД
+        попадает последняя версия. Вне event loop сохраняет сразу.
+        """
+        if self._persist_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.persist_state()
+            return
+        self._persist_handle = loop.call_later(
+            POLL_STATE_PERSIST_DELAY_SECONDS, self.persist_state
+        )
+
     def persist_state(self) -> None:
-        """Сохранить состояние опросов в базу данных."""
+        """Сохранить состояние опросов в базу данных (с отменой отложенного)."""
+        if self._persist_handle is not None:
+            self._persist_handle.cancel()
+            self._persist_handle = None
         serializable: dict[str, dict] = {}
         for poll_id, data in self._poll_data.items():
             serializable[poll_id] = data.model_dump(mode="json")
@@ -1649,36 +1671,35 @@ class PollService:
         """Применяет списания к БД и возвращает список данных для отчёта."""
         charged: list[dict[str, Any]] = []
         for charge in result.subscriber_charges:
-            ensure_player(charge.user_id)
-            player_data = get_player_balance(charge.user_id)
-            old_balance = player_data.get("balance", 0) if player_data else 0
-
-            update_player_balance(charge.user_id, -charge.total)
-            new_balance = old_balance - charge.total
-
             halls_str = ", ".join(charge.halls)
-            add_transaction(
+            # Одна транзакция: регистрация игрока, списание и запись в истории;
+            # новый баланс и имя приходят через RETURNING
+            player_data = charge_player_atomic(
                 charge.user_id,
-                -charge.total,
+                charge.total,
                 f"Абонемент: {halls_str} ({month})",
             )
-
-            player_name = ""
-            if player_data:
-                player_name = (
-                    player_data.get("fullname")
-                    or player_data.get("name")
-                    or f"ID: {charge.user_id}"
+            if player_data is None:
+                logging.error(
+                    f"❌ Не удалось списать абонемент {charge.total}₽ "
+                    f"с игрока ID {charge.user_id}, пропускаем"
                 )
-            else:
-                player_name = f"ID: {charge.user_id}"
+                continue
+            new_balance = int(player_data["balance"])
+            old_balance = new_balance + charge.total
+
+            player_name = (
+                player_data.get("fullname")
+                or player_data.get("name")
+                or f"ID: {charge.user_id}"
+            )
 
             charged.append(
                 {
                     "user_id": charge.user_id,
                     "name": player_name,
-                    "username": player_data.get("name") if player_data else None,
-                    "fullname": player_data.get("fullname") if player_data else None,
+                    "username": player_data.get("name"),
+                    "fullname": player_data.get("fullname"),
                     "halls": charge.halls,
                     "amount": charge.total,
                     "old_balance": old_balance,
@@ -1946,27 +1967,27 @@ class PollService:
                     )
                     continue
 
-            # Убеждаемся, что игрок есть в БД
-            ensure_player(entry.player_id, entry.rendered_name)
-
-            # Получаем текущий баланс (get_player_balance возвращает dict с ключом "balance" или None)
-            player_data = get_player_balance(entry.player_id)
-            old_balance = player_data.get("balance", 0) if player_data else 0
-
-            # Списываем средства
-            update_player_balance(entry.player_id, -cost)
-            new_balance = old_balance - cost
-
-            # Добавляем транзакцию в историю
+            # Регистрируем игрока, списываем средства и пишем транзакцию одной
+            # транзакцией БД: новый баланс приходит из UPDATE ... RETURNING,
+            # старый восстанавливаем по сумме списания
             game_date = datetime.now().strftime("%d.%m.%Y")
-            description = f"Зал: {poll_name} ({game_date})"
-            add_transaction(
+            player_data = charge_player_atomic(
                 entry.player_id,
-                -cost,
-                description,
+                cost,
+                f"Зал: {poll_name} ({game_date})",
+                name=entry.rendered_name,
                 poll_template_id=int(poll_config["id"]),
                 poll_name_snapshot=poll_name,
             )
+            if player_data is None:
+                logging.error(
+                    f"❌ Не удалось списать {cost}₽ с {entry.rendered_name} "
+                    f"(ID: {entry.player_id}), участие записано без списания"
+                )
+                append_participant_finance_row(entry, is_subscriber=False)
+                continue
+            new_balance = int(player_data["balance"])
+            old_balance = new_balance + cost
 
             charged_players.append(
                 {
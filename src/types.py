@@ -26,8 +26,6 @@ class PollTemplate(PollTemplateRequired, total=False):
     cost: int  # Стоимость одной игры
     cost_per_game: int  # Стоимость аренды зала за игру
     enabled: int  # 1 = шаблон включён, 0 = выключен
-    created_at: str  # Время создания
-    updated_at: str  # Время последнего обновления
     subs: list[int]  # Список user_id подписчиков (добавляется в get_poll_templates)
 
 
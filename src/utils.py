@@ -13,20 +13,20 @@ import os
 import re
 import time
 import traceback
-from collections import defaultdict
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Awaitable, Callable
 
 from aiogram.types import User
 
-# Rate limiting: хранение времени последних запросов
-# Структура: {user_id: [timestamp1, timestamp2, ...]}
-_RATE_LIMIT_CACHE: dict[int, list[float]] = defaultdict(list)
-
 # Настройки rate limiting
 RATE_LIMIT_WINDOW = 60  # Окно в секундах
-RATE_LIMIT_MAX_REQUESTS = 20  # Максимум запросов в окне
+RATE_LIMIT_MAX_REQUESTS = 20  # Максимум запросов в любом окне
+
+# Rate limiting: время последних принятых запросов (не больше лимита)
+# Структура: {user_id: deque([timestamp1, timestamp2, ...])}
+_RATE_LIMIT_CACHE: dict[int, deque[float]] = {}
 DEFAULT_GAMES_PER_MONTH = 4
 TELEGRAM_USERNAME_RE = re.compile(r"^(?=.{1,32}$)(?=.*[A-Za-z0-9])[A-Za-z0-9_]+$")
 WEEKDAY_TO_INDEX: dict[str, int] = {
@@ -139,16 +139,19 @@ def retry_async(
                         raise e
 
                     tries_left = f"{_tries - attempt}" if _tries and _tries > 0 else "∞"
+                    # При flood control Telegram сам сообщает, сколько ждать
+                    # (TelegramRetryAfter.retry_after); повтор раньше бесполезен
+                    wait = max(_delay, getattr(e, "retry_after", 0) or 0)
                     msg = (
                         f"⚠️ Ошибка в {func.__name__}: {type(e).__name__}: {e}. "
-                        f"Повтор через {_delay}с... (осталось попыток: {tries_left})"
+                        f"Повтор через {wait}с... (осталось попыток: {tries_left})"
                     )
                     if logger:
                         logger.warning(msg)
                     else:
                         logging.warning(msg)
 
-                    await asyncio.sleep(_delay)
+                    await asyncio.sleep(wait)
                     attempt += 1
                     _delay = min(_delay * backoff, max_delay)
 
@@ -267,6 +270,9 @@ def escape_html(text: str) -> str:
     Returns:
         Текст с экранированными символами &, < и >
     """
+    # Имена и названия обычно без спецсимволов: проверка дешевле трёх replace
+    if "&" not in text and "<" not in text and ">" not in text:
+        return text
     return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
 
@@ -280,20 +286,21 @@ def is_rate_limited(user_id: int) -> bool:
     Returns:
         True если лимит превышен, иначе False
     """
-    current_time = time.time()
-    window_start = current_time - RATE_LIMIT_WINDOW
-
-    # Очищаем старые записи
-    _RATE_LIMIT_CACHE[user_id] = [
-        t for t in _RATE_LIMIT_CACHE[user_id] if t > window_start
-    ]
-
-    # Проверяем лимит
-    if len(_RATE_LIMIT_CACHE[user_id]) >= RATE_LIMIT_MAX_REQUESTS:
+    now = time.monotonic()
+    timestamps = _RATE_LIMIT_CACHE.get(user_id)
+    if timestamps is None:
+        timestamps = _RATE_LIMIT_CACHE[user_id] = deque(maxlen=RATE_LIMIT_MAX_REQUESTS)
+
+    # Лимит превышен, только если все последние запросы попали в окно:
+    # достаточно сравнить самый старый из них
+    if (
+        len(timestamps) == RATE_LIMIT_MAX_REQUESTS
+        and timestamps[0] > now - RATE_LIMIT_WINDOW
+    ):
         return True
 
-    # Добавляем текущий запрос
-    _RATE_LIMIT_CACHE[user_id].append(current_time)
+    # deque с maxlen сам вытесняет самую старую запись
+    timestamps.append(now)
     return False
 
 
@@ -504,14 +511,16 @@ def validate_balance_callback_data(
     Returns:
         Кортеж (player_id, amount) или None при ошибке валидации
     """
-    parts = data.split(":")
-    if len(parts) != 3 or parts[0] != expected_prefix:
+    # partition не создаёт список; лишнее ":" в хвосте отсекает int()
+    prefix, _, rest = data.partition(":")
+    if prefix != expected_prefix:
         logging.warning(f"❌ Invalid callback data format: {data}")
         return None
 
+    raw_player_id, _, raw_amount = rest.partition(":")
     try:
-        player_id = int(parts[1])
-        amount = int(parts[2])
+        player_id = int(raw_player_id)
+        amount = int(raw_amount)
     except ValueError:
         logging.warning(f"❌ Non-integer values in callback data: {data}")
         return None
@@ -538,13 +547,13 @@ def validate_player_select_callback_data(data: str, expected_prefix: str) -> int
     Returns:
         player_id или None при ошибке валидации
     """
-    parts = data.split(":")
-    if len(parts) != 2 or parts[0] != expected_prefix:
+    prefix, _, raw_player_id = data.partition(":")
+    if prefix != expected_prefix:
         logging.warning(f"❌ Invalid player_select callback data: {data}")
         return None
 
     try:
-        player_id = int(parts[1])
+        player_id = int(raw_player_id)
     except ValueError:
         logging.warning(f"❌ Non-integer player_id in callback data: {data}")
         return None
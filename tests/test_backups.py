@@ -1,4 +1,5 @@
 import os
+import sqlite3
 from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
@@ -7,7 +8,14 @@ import pytest
 from aiogram import Bot, Dispatcher
 from aiogram.types import Chat, Message, Update
 
-from src.db import cleanup_old_backups, create_backup, create_game, init_db, save_state
+from src.db import (
+    _connect,
+    cleanup_old_backups,
+    create_backup,
+    create_game,
+    init_db,
+    save_state,
+)
 from src.handlers import register_handlers
 from src.poll import PollData
 from src.services import BotStateService, PollService
@@ -25,6 +33,21 @@ class TestDatabaseBackups:
         assert backup_path.suffix == ".sqlite3"
         assert "startup" in backup_path.name
 
+    def test_backup_of_wal_database_uses_rollback_journal(self, temp_db):
+        init_db()
+        with _connect() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        backup_path = create_backup("startup")
+
+        assert backup_path is not None
+        backup_conn = sqlite3.connect(str(backup_path))
+        try:
+            mode = backup_conn.execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            backup_conn.close()
+        assert mode == "delete"
+
     def test_cleanup_old_backups_removes_only_expired_files(self, temp_db):
         init_db()
         backup_path = create_backup("startup")
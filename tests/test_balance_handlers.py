@@ -13,7 +13,11 @@ from aiogram.types import (
     Update,
 )
 
-from src.handlers import register_handlers
+from src.handlers import (
+    MESSAGE_CHUNK_LIMIT,
+    _format_player_detail,
+    register_handlers,
+)
 from src.services import BotStateService, PollService
 
 
@@ -125,7 +129,7 @@ class TestBalanceCommand:
 class TestPayCommand:
     """Тесты для команды /pay."""
 
-    @patch("src.handlers.update_player_and_fund_balance_atomic", return_value=True)
+    @patch("src.handlers.update_player_and_fund_balance_atomic")
     @patch("src.handlers.get_player_balance")
     @patch("src.handlers.ensure_player")
     async def test_pay_reply_as_admin(
@@ -141,8 +145,12 @@ class TestPayCommand:
         bot = AsyncMock(spec=Bot)
         dp = Dispatcher()
 
-        mock_update.return_value = True
-        mock_get_balance.return_value = {"balance": 500}
+        mock_update.return_value = {
+            "id": regular_user.id,
+            "name": "regular_user",
+            "fullname": "Regular User",
+            "balance": 500,
+        }
 
         dp.workflow_data.update(
             {
@@ -176,6 +184,7 @@ class TestPayCommand:
 
         mock_ensure.assert_called()
         mock_update.assert_called_with(regular_user.id, 500, ANY)
+        mock_get_balance.assert_not_called()
         assert bot.called
         method = bot.call_args.args[0]
         # Проверяем, что в ответе есть гиперссылка на игрока
@@ -187,7 +196,7 @@ class TestPayCommand:
         )
 
     @patch("src.handlers.find_player_by_name")
-    @patch("src.handlers.update_player_and_fund_balance_atomic", return_value=True)
+    @patch("src.handlers.update_player_and_fund_balance_atomic")
     @patch("src.handlers.get_player_balance")
     async def test_pay_by_name_single_match(
         self, mock_get_balance, mock_update, mock_find, admin_user, admin_service
@@ -199,8 +208,7 @@ class TestPayCommand:
         mock_find.return_value = [
             {"id": 777, "name": "pete", "fullname": "Peter", "balance": 0}
         ]
-        mock_update.return_value = True
-        mock_get_balance.return_value = {
+        mock_update.return_value = {
             "id": 777,
             "name": "pete",
             "fullname": "Peter",
@@ -230,6 +238,7 @@ class TestPayCommand:
 
         mock_find.assert_called_with("Peter")
         mock_update.assert_called_with(777, 100, ANY)
+        mock_get_balance.assert_not_called()
         assert bot.called
         method = bot.call_args.args[0]
         # Проверяем, что в ответе есть гиперссылка на игрока
@@ -283,7 +292,7 @@ class TestPayCommand:
         assert buttons[0][0].callback_data == "pay_select:1:500"
 
     @patch("src.handlers.get_player_balance")
-    @patch("src.handlers.update_player_and_fund_balance_atomic", return_value=True)
+    @patch("src.handlers.update_player_and_fund_balance_atomic")
     async def test_pay_by_id(
         self, mock_update, mock_get_balance, admin_user, admin_service
     ):
@@ -291,14 +300,15 @@ class TestPayCommand:
         bot = AsyncMock(spec=Bot)
         dp = Dispatcher()
 
-        # Первый вызов для проверки существования игрока, второй для получения нового баланса
+        # get_player_balance проверяет существование игрока, новый баланс
+        # приходит из самого обновления
         mock_get_balance.return_value = {
             "id": 12345,
             "name": None,
             "fullname": "ID Player",
-            "balance": 500,
+            "balance": 0,
         }
-        mock_update.return_value = True
+        mock_update.return_value = {**mock_get_balance.return_value, "balance": 500}
 
         dp.workflow_data.update(
             {
@@ -321,7 +331,7 @@ class TestPayCommand:
 
         await dp.feed_update(bot, Update(update_id=7, message=message))
 
-        mock_get_balance.assert_called_with(12345)
+        mock_get_balance.assert_called_once_with(12345)
         mock_update.assert_called_with(12345, 500, ANY)
         assert bot.called
         method = bot.call_args.args[0]
@@ -331,11 +341,86 @@ class TestPayCommand:
         assert '<a href="tg://user?id=12345">ID Player</a>' in method.text
 
 
+    @patch("src.handlers.find_player_by_name")
+    @patch("src.handlers.update_player_and_fund_balance_atomic")
+    @patch("src.handlers.get_player_balance")
+    async def test_pay_by_full_name_with_negative_amount(
+        self, mock_get_balance, mock_update, mock_find, admin_user, admin_service
+    ):
+        """Имя из нескольких слов и сумма со знаком разбираются с конца."""
+        bot = AsyncMock(spec=Bot)
+        dp = Dispatcher()
+
+        player = {"id": 777, "name": "pete", "fullname": "Peter Pan", "balance": 0}
+        mock_find.return_value = [player]
+        mock_update.return_value = {**player, "balance": -300}
+
+        dp.workflow_data.update(
+            {
+                "admin_service": admin_service,
+                "bot_state_service": MagicMock(),
+                "poll_service": MagicMock(),
+            }
+        )
+
+        register_handlers(dp, bot)
+
+        chat = Chat(id=-1001234567890, type="supergroup")
+        message = Message(
+            message_id=5,
+            date=MagicMock(),
+            chat=chat,
+            from_user=admin_user,
+            text="/pay Peter Pan -300",
+        )
+
+        await dp.feed_update(bot, Update(update_id=5, message=message))
+
+        mock_find.assert_called_with("Peter Pan")
+        mock_update.assert_called_with(777, -300, ANY)
+        mock_get_balance.assert_not_called()
+
+    @patch("src.handlers.find_player_by_name")
+    @patch("src.handlers.update_player_and_fund_balance_atomic")
+    async def test_pay_rejects_non_numeric_amount(
+        self, mock_update, mock_find, admin_user, admin_service
+    ):
+        """Нечисловая сумма в конце команды даёт подсказку без поиска игрока."""
+        bot = AsyncMock(spec=Bot)
+        dp = Dispatcher()
+
+        dp.workflow_data.update(
+            {
+                "admin_service": admin_service,
+                "bot_state_service": MagicMock(),
+                "poll_service": MagicMock(),
+            }
+        )
+
+        register_handlers(dp, bot)
+
+        chat = Chat(id=-1001234567890, type="supergroup")
+        message = Message(
+            message_id=6,
+            date=MagicMock(),
+            chat=chat,
+            from_user=admin_user,
+            text="/pay Peter 5²",
+        )
+
+        await dp.feed_update(bot, Update(update_id=6, message=message))
+
+        mock_find.assert_not_called()
+        mock_update.assert_not_called()
+        method = bot.call_args.args[0]
+        assert "сумма должна быть числом в конце команды" in method.text
+
+
 @pytest.mark.asyncio
 class TestPayCallback:
     """Тесты для обработки callback_query при выборе игрока."""
 
-    @patch("src.handlers.update_player_and_fund_balance_atomic", return_value=True)
+    @patch("src.handlers.update_player_and_fund_balance_atomic")
     @patch("src.handlers.get_player_balance")
     async def test_process_pay_select(
         self, mock_get_balance, mock_update, admin_user, admin_service
@@ -344,8 +429,12 @@ class TestPayCallback:
         bot = AsyncMock(spec=Bot)
         dp = Dispatcher()
 
-        mock_update.return_value = True
-        mock_get_balance.return_value = {"id": 1, "fullname": "Alim B.", "balance": 500}
+        mock_update.return_value = {
+            "id": 1,
+            "name": None,
+            "fullname": "Alim B.",
+            "balance": 500,
+        }
 
         dp.workflow_data.update(
             {
@@ -377,13 +466,52 @@ class TestPayCallback:
         await dp.feed_update(bot, Update(update_id=6, callback_query=callback_query))
 
         mock_update.assert_called_with(1, 500, ANY)
-        mock_get_balance.assert_called_once_with(1)
+        mock_get_balance.assert_not_called()
         # Проверяем, что баланс был успешно обновлен (через логи или состояние)
         # Так как edit_text вызывается через aiogram API, мы не можем напрямую
         # проверить вызов метода бота. Достаточно убедиться, что функции
         # обновления баланса были вызваны с правильными параметрами.
 
 
+class TestFormatPlayerDetail:
+    """Тесты карточки игрока."""
+
+    def test_detail_with_username(self):
+        """Карточка содержит все строки, включая @username."""
+        player = {
+            "id": 7,
+            "name": " nick ",
+            "fullname": "Ник",
+            "balance": -50,
+            "ball_donate": True,
+        }
+        with patch("src.handlers.format_player_link", return_value="LINK"):
+            text = _format_player_detail(player, [])
+        assert text == (
+            "👤 LINK\n"
+            "ID: 7\n"
+            "🪪 @nick\n"
+            "💰 Баланс: -50 ₽\n"
+            "🎟 Абонемент: нет\n"
+            "🏐 Донат: да\n"
+            "🙋 Гость: нет"
+        )
+
+    def test_detail_without_username(self):
+        """Без username строка с @ не выводится."""
+        player = {"id": 7, "name": "", "fullname": "Ник", "is_guest": 1}
+        with patch("src.handlers.format_player_link", return_value="LINK"):
+            text = _format_player_detail(player, [])
+        assert text == (
+            "👤 LINK\n"
+            "ID: 7\n"
+            "💰 Баланс: 0 ₽\n"
+            "🎟 Абонемент: нет\n"
+            "🏐 Донат: нет\n"
+            "🙋 Гость: да"
+        )
+
+
 @pytest.mark.asyncio
 class TestPlayerCommand:
     """Тесты для команды /player."""
@@ -397,7 +525,7 @@ class TestPlayerCommand:
         bot = AsyncMock(spec=Bot)
         dp = Dispatcher()
 
-        mock_get_info.return_value = {
+        mock_ensure.return_value = {
             "id": regular_user.id,
             "name": "regular_user",
             "fullname": "Regular User",
@@ -435,7 +563,8 @@ class TestPlayerCommand:
         await dp.feed_update(bot, Update(update_id=2, message=message))
 
         mock_ensure.assert_called_once()
-        mock_get_info.assert_called_once_with(regular_user.id)
+        # Данные игрока приходят из ensure_player, повторный запрос не нужен
+        mock_get_info.assert_not_called()
         assert bot.called
         method = bot.call_args.args[0]
         assert "Regular User" in method.text or "regular_user" in method.text
@@ -512,15 +641,15 @@ class TestPlayerCommand:
         dp = Dispatcher()
 
         mock_find.return_value = [
-            {"id": 777, "name": "pete", "fullname": "Peter", "balance": 0},
+            {
+                "id": 777,
+                "name": "pete",
+                "fullname": "Peter",
+                "ball_donate": True,
+                "is_guest": False,
+                "balance": 0,
+            },
         ]
-        mock_get_info.return_value = {
-            "id": 777,
-            "name": "pete",
-            "fullname": "Peter",
-            "ball_donate": False,
-            "balance": 0,
-        }
 
         dp.workflow_data.update(
             {
@@ -544,10 +673,12 @@ class TestPlayerCommand:
         await dp.feed_update(bot, Update(update_id=4, message=message))
 
         mock_find.assert_called_with("Peter")
-        mock_get_info.assert_called_once_with(777)
+        # Карточка строится из результата поиска без повторного запроса
+        mock_get_info.assert_not_called()
         assert bot.called
         method = bot.call_args.args[0]
         assert "Peter" in method.text
+        assert "Донат: да" in method.text
 
     @patch("src.handlers.find_player_by_name")
     async def test_player_by_name_multiple_matches(
@@ -659,6 +790,48 @@ class TestPlayerCommand:
         assert "абонемент: нет" in method.text
         assert "абонемент: Пятница (Зал №1)" in method.text
         assert "мяч" in method.text.lower()
+        assert "и ещё" not in method.text
+
+    @patch("src.handlers.get_poll_templates", return_value=[])
+    @patch("src.handlers.get_all_players")
+    async def test_player_list_truncated_to_message_limit(
+        self, mock_get_all, mock_get_templates, admin_user, admin_service
+    ):
+        """Длинный список игроков обрезается по лимиту сообщения."""
+        bot = AsyncMock(spec=Bot)
+        dp = Dispatcher()
+
+        mock_get_all.return_value = [
+            {"id": i, "name": f"user{i}", "fullname": f"Игрок {i}", "balance": 0}
+            for i in range(1, 201)
+        ]
+
+        dp.workflow_data.update(
+            {
+                "admin_service": admin_service,
+                "bot_state_service": MagicMock(),
+                "poll_service": MagicMock(),
+            }
+        )
+
+        register_handlers(dp, bot)
+
+        chat = Chat(id=-1001234567890, type="supergroup")
+        message = Message(
+            message_id=7,
+            date=MagicMock(),
+            chat=chat,
+            from_user=admin_user,
+            text="/player",
+        )
+
+        await dp.feed_update(bot, Update(update_id=7, message=message))
+
+        text = bot.call_args.args[0].text
+        assert len(text) <= MESSAGE_CHUNK_LIMIT
+        shown = text.count("\n• ")
+        assert 0 < shown < 200
+        assert text.endswith(f"… и ещё (показаны первые {shown}).")
 
     @patch("src.handlers.get_all_players")
     async def test_player_regular_user_ignored(
@@ -1,12 +1,18 @@
+from unittest.mock import patch
+
 from aiogram.types import User
 
+import src.db as db
 from src.db import (
     _connect,
     ensure_player,
+    find_player_by_name,
     get_all_players,
     get_player_info,
     init_db,
+    set_player_guest,
     toggle_player_ball_donate,
+    update_player_balance,
 )
 from src.utils import get_player_name
 
@@ -129,6 +135,39 @@ class TestDBPlayers:
         assert players[0]["name"] == "new_user123", "Существующий name должен обновиться"
         assert players[0]["fullname"] == "New Name", "NULL fullname должен заполниться"
 
+    def test_ensure_player_skips_write_when_unchanged(self, temp_db):
+        """Повторный вызов с теми же данными не меняет строку."""
+        init_db()
+        ensure_player(user_id=321, name="same", fullname="Same User")
+        with _connect() as conn:
+            conn.execute("UPDATE players SET updated_at = '2000-01-01' WHERE id = 321")
+            conn.commit()
+
+        ensure_player(user_id=321, name="same", fullname="Other Name")
+        ensure_player(user_id=321, name=None, fullname=None)
+
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT name, fullname, updated_at FROM players WHERE id = 321"
+            ).fetchone()
+        assert row == ("same", "Same User", "2000-01-01")
+
+    def test_ensure_player_returns_player_row(self, temp_db):
+        """ensure_player возвращает данные и новой, и неизменённой строки."""
+        init_db()
+        expected = {
+            "id": 322,
+            "name": "returned",
+            "fullname": "Returned User",
+            "ball_donate": False,
+            "is_guest": False,
+            "balance": 0,
+        }
+
+        assert ensure_player(322, "returned", "Returned User") == expected
+        assert ensure_player(322, "returned", "Returned User") == expected
+        assert ensure_player(322) == expected
+
     def test_ensure_player_invalid_username_preserves_existing_name(self, temp_db):
         """Невалидный username не должен затирать сохранённый username."""
         init_db()
@@ -220,6 +259,44 @@ class TestDBPlayers:
         assert players[0]["name"] is None  # должен быть очищен
 
 
+class TestGetAllPlayersCache:
+    """Тесты кэширования get_all_players."""
+
+    def test_cache_invalidated_on_player_writes(self, temp_db):
+        """Кэш сбрасывается при изменении игроков через модуль."""
+        init_db()
+        ensure_player(user_id=70, name="u70", fullname="U 70")
+
+        first = get_all_players()
+        # Изменение возвращённых данных не должно портить кэш
+        first[0]["balance"] = 999
+        assert get_all_players()[0]["balance"] == 0
+
+        update_player_balance(70, 150)
+        assert get_all_players()[0]["balance"] == 150
+
+        set_player_guest(70, True)
+        assert get_all_players()[0]["is_guest"] is True
+
+        ensure_player(user_id=71, name="u71", fullname="U 71")
+        assert {p["id"] for p in get_all_players()} == {70, 71}
+
+    def test_cache_expires_after_ttl(self, temp_db):
+        """Изменения в обход модуля видны после истечения TTL."""
+        init_db()
+        ensure_player(user_id=72, name="u72", fullname="U 72")
+        assert get_all_players()[0]["balance"] == 0
+
+        with _connect() as conn:
+            conn.execute("UPDATE players SET balance = 40 WHERE id = 72")
+            conn.commit()
+        assert get_all_players()[0]["balance"] == 0
+
+        expired = db._players_cache[2] + db._PLAYERS_CACHE_TTL
+        with patch("src.db.time.monotonic", return_value=expired):
+            assert get_all_players()[0]["balance"] == 40
+
+
 class TestGetPlayerInfo:
     """Тесты для get_player_info."""
 
@@ -261,6 +338,111 @@ class TestGetPlayerInfo:
         assert get_player_info(99999) is None
 
 
+class TestFindPlayerByName:
+    """Тесты для find_player_by_name."""
+
+    def test_prefix_match_preferred_over_substring(self, temp_db):
+        """При наличии совпадения по префиксу подстрочные не возвращаются."""
+        init_db()
+        ensure_player(user_id=1, name="ivan", fullname="Иван Петров")
+        ensure_player(user_id=2, name="petr", fullname="Пётр Иванов")
+
+        players = find_player_by_name("Иван")
+        assert [p["id"] for p in players] == [1]
+
+    def test_returns_player_card_fields(self, temp_db):
+        """Результат поиска содержит все поля карточки игрока."""
+        init_db()
+        ensure_player(user_id=1, name="ivan", fullname="Иван Петров")
+        toggle_player_ball_donate(1)
+
+        assert find_player_by_name("Иван") == [get_player_info(1)]
+
+    def test_username_query_prefers_exact_match(self, temp_db):
+        """@username находит точное совпадение без похожих имён."""
+        init_db()
+        ensure_player(user_id=1, name="ivan", fullname="Иван Петров")
+        ensure_player(user_id=2, name="ivanov", fullname="Пётр Иванов")
+
+        assert [p["id"] for p in find_player_by_name("@IVAN")] == [1]
+        # Без @ поиск по-прежнему префиксный
+        assert {p["id"] for p in find_player_by_name("ivan")} == {1, 2}
+
+    def test_username_query_falls_back_to_prefix(self, temp_db):
+        """Если точного username нет, @запрос ищется как обычный префикс."""
+        init_db()
+        ensure_player(user_id=2, name="ivanov", fullname="Пётр Иванов")
+
+        assert [p["id"] for p in find_player_by_name("@iva")] == [2]
+
+    def test_falls_back_to_substring(self, temp_db):
+        """Без совпадений по префиксу выполняется поиск по подстроке."""
+        init_db()
+        ensure_player(user_id=1, name="ivan", fullname="Иван Петров")
+
+        players = find_player_by_name("Петров")
+        assert [p["id"] for p in players] == [1]
+
+    def test_word_prefix_uses_fts_index(self, temp_db):
+        """Префикс слова находится через FTS5 и учитывает переименования."""
+        init_db()
+        ensure_player(user_id=1, name="ivan", fullname="Иван Петров")
+        with _connect() as conn:
+            conn.execute("UPDATE players SET fullname = 'Иван Сидоров' WHERE id = 1")
+            conn.execute("UPDATE players SET balance = 100 WHERE id = 1")
+            conn.commit()
+            fts_ids = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT rowid FROM players_fts WHERE players_fts MATCH ?",
+                    ('"сид"*',),
+                )
+            ]
+
+        assert fts_ids == [1]
+        assert [p["id"] for p in find_player_by_name("сид")] == [1]
+        assert find_player_by_name("Петров") == []
+
+    def test_mid_word_substring_still_found(self, temp_db):
+        """Подстрока внутри слова находится запасным поиском через LIKE."""
+        init_db()
+        ensure_player(user_id=1, name="ivan", fullname="Иван Петров")
+
+        assert [p["id"] for p in find_player_by_name("етро")] == [1]
+
+    def test_wildcards_are_escaped(self, temp_db):
+        """Символы % и _ в запросе ищутся буквально."""
+        init_db()
+        ensure_player(user_id=1, name="ivan", fullname="Иван")
+
+        assert find_player_by_name("%") == []
+        assert find_player_by_name("_") == []
+
+    def test_nocase_indexes_created(self, temp_db):
+        """Для name и fullname созданы NOCASE-индексы."""
+        init_db()
+        with _connect() as conn:
+            indexes = {
+                row[1] for row in conn.execute("PRAGMA index_list(players)").fetchall()
+            }
+        assert "idx_players_name_nocase" in indexes
+        assert "idx_players_fullname_nocase" in indexes
+
+    def test_players_with_balance_uses_partial_index(self, temp_db):
+        """get_players_with_balance читает частичный индекс без сортировки."""
+        init_db()
+        with _connect() as conn:
+            plan = " ".join(
+                str(row[3])
+                for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT id, name, fullname, balance "
+                    "FROM players WHERE balance != 0 ORDER BY fullname ASC"
+                ).fetchall()
+            )
+        assert "idx_players_balance_nonzero" in plan
+        assert "TEMP B-TREE" not in plan
+
+
 class TestTogglePlayerBallDonate:
     """Тесты для toggle_player_ball_donate."""
 
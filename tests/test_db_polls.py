@@ -3,6 +3,7 @@ import sqlite3
 import pytest
 
 from src.db import (
+    SCHEMA_VERSION,
     _connect,
     _create_current_schema,
     add_poll_subscription,
@@ -152,7 +153,54 @@ class TestDBPolls:
             assert "is_guest" in player_columns
             assert "is_guest" in participant_columns
             assert "guest_free_reason" in participant_columns
-            assert user_version == 9
+            assert user_version == SCHEMA_VERSION
+
+    def test_init_db_replaces_hall_payments_month_index(self, temp_db):
+        """При миграции с версии 9 индекс по month заменяется покрывающим."""
+        init_db()
+        with _connect() as conn:
+            conn.execute("DROP INDEX idx_hall_payments_month_template")
+            conn.execute("CREATE INDEX idx_hall_payments_month ON hall_payments(month)")
+            conn.execute("PRAGMA user_version = 9")
+            conn.commit()
+
+        init_db()
+
+        with _connect() as conn:
+            indexes = {
+                row[1] for row in conn.execute("PRAGMA index_list(hall_payments)")
+            }
+            plan = " ".join(
+                str(row[3])
+                for row in conn.execute(
+                    "EXPLAIN QUERY PLAN "
+                    "SELECT poll_template_id FROM hall_payments WHERE month = ?",
+                    ("2026-02",),
+                )
+            )
+        assert "idx_hall_payments_month" not in indexes
+        assert "idx_hall_payments_month_template" in indexes
+        assert "COVERING INDEX idx_hall_payments_month_template" in plan
+
+    def test_init_db_adds_paid_poll_templates_index(self, temp_db):
+        """При миграции с версии 11 создаётся частичный индекс платных залов."""
+        init_db()
+        with _connect() as conn:
+            conn.execute("DROP INDEX idx_poll_templates_paid")
+            conn.execute("PRAGMA user_version = 11")
+            conn.commit()
+
+        init_db()
+
+        with _connect() as conn:
+            plan = " ".join(
+                str(row[3])
+                for row in conn.execute(
+                    "EXPLAIN QUERY PLAN "
+                    "SELECT id FROM poll_templates WHERE cost_per_game > 0 ORDER BY id"
+                )
+            )
+        assert "idx_poll_templates_paid" in plan
 
     def test_save_game_participants_persists_guest_fields(self, temp_db):
         init_db()
@@ -258,6 +306,48 @@ class TestDBPolls:
         assert poll_stats["games_count"] == 1
         assert player_stats["games_total"] == 1
 
+    def test_poll_stats_averages_and_last_game(self, temp_db):
+        """Средние по играм и последняя игра считаются в SQL."""
+        init_db()
+        template_id = save_poll_template({"name": "Среда", "message": "Игра"})
+        assert template_id is not None
+
+        def participant(player_id: int, bucket: str, order: int) -> dict:
+            return {
+                "player_id": player_id,
+                "roster_bucket": bucket,
+                "sort_order": order,
+                "is_subscriber": False,
+                "charged_amount": 0,
+                "charge_source": "none",
+                "balance_before": 0,
+                "balance_after": 0,
+            }
+
+        _create_closed_game_with_participants(
+            poll_id="g1",
+            template_id=template_id,
+            closed_at="2026-03-04T10:00:00+00:00",
+            cost_per_game_snapshot=0,
+            participants=[participant(1, "main", 1), participant(2, "reserve", 2)],
+        )
+        _create_closed_game_with_participants(
+            poll_id="g2",
+            template_id=template_id,
+            closed_at="2026-03-11T10:00:00+00:00",
+            cost_per_game_snapshot=0,
+            participants=[participant(1, "main", 1)],
+        )
+
+        poll_stats = get_poll_stats(template_id, "2026-03")
+        assert poll_stats["avg_interest"] == 1.5
+        assert poll_stats["avg_main"] == 1.0
+        assert poll_stats["last_game"] == "2026-03-11T10:00:00+00:00"
+
+        summary = get_stats_summary("2026-03")
+        assert summary["avg_interest"] == 1.5
+        assert summary["avg_main"] == 1.0
+
     def test_single_game_income_stats_aggregates_paid_games(self, temp_db):
         init_db()
         save_poll_template(
@@ -457,6 +547,27 @@ class TestDBPolls:
         assert "subs" in templates[0]
         assert set(templates[0]["subs"]) == {123, 456}
 
+    def test_get_poll_templates_cache_invalidated_on_write(self, temp_db):
+        """Кэш шаблонов сбрасывается при сохранении шаблона и подписки."""
+        init_db()
+        _insert_player(123)
+        template_id = save_poll_template({"name": "Cached", "message": "Msg"})
+        assert template_id is not None
+
+        first = get_poll_templates()
+        assert first[0]["subs"] == []
+        # Изменение возвращённых данных не должно портить кэш
+        first[0]["subs"].append(999)
+        assert get_poll_templates()[0]["subs"] == []
+
+        assert add_poll_subscription(template_id, 123) == "success"
+        assert get_poll_templates()[0]["subs"] == [123]
+
+        save_poll_template({"name": "Cached", "message": "Updated", "subs": []})
+        templates = get_poll_templates()
+        assert templates[0]["message"] == "Updated"
+        assert templates[0]["subs"] == []
+
     def test_save_and_get_poll_templates_with_enabled_flag(self, temp_db):
         """Проверка сохранения признака enabled у шаблона."""
         init_db()
@@ -879,3 +990,4 @@ class TestDBPolls:
 
         with pytest.raises(sqlite3.DatabaseError, match="poll_templates: primary key"):
             init_db()
+
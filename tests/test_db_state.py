@@ -0,0 +1,190 @@
+"""Тесты слоя хранения: соединение с БД, инициализация схемы, kv_store."""
+
+import os
+import sqlite3
+from pathlib import Path
+from unittest.mock import patch
+
+import src.db as db
+from src.db import (
+    _connect,
+    close_db,
+    create_backup,
+    ensure_player,
+    get_fund_balance,
+    get_player_info,
+    init_db,
+    load_state,
+    save_state,
+    update_fund_balance,
+)
+
+
+class TestLazyInit:
+    """Тесты однократной инициализации схемы."""
+
+    def test_first_call_initializes_db_and_later_calls_skip(self, temp_db):
+        """Первый вызов создаёт схему, последующие не вызывают init_db."""
+        with patch("src.db.init_db", wraps=init_db) as init_mock:
+            save_state("key", {"a": 1})
+            assert init_mock.call_count == 1
+
+            assert load_state("key") == {"a": 1}
+            assert get_fund_balance() == 0
+            assert init_mock.call_count == 1
+
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='players'"
+            ).fetchone()
+        assert row is not None
+
+    def test_db_path_change_triggers_new_init(self, temp_db, tmp_path, monkeypatch):
+        """Для новой БД схема инициализируется заново."""
+        save_state("key", 1)
+
+        monkeypatch.setenv("VOLLEYBOT_DB_PATH", str(tmp_path / "other.db"))
+        with patch("src.db.init_db", wraps=init_db) as init_mock:
+            assert load_state("key") is None
+            assert init_mock.call_count == 1
+        assert db._initialized_db_path == str(tmp_path / "other.db")
+
+
+    def test_init_db_skips_schema_checks_for_current_version(self, temp_db):
+        """Для БД с актуальным user_version миграции и проверки не запускаются."""
+        init_db()
+        with patch("src.db._ensure_current_schema") as ensure_mock:
+            init_db()
+        ensure_mock.assert_not_called()
+
+        with _connect() as conn:
+            conn.execute(f"PRAGMA user_version = {db.SCHEMA_VERSION - 1}")
+        with patch("src.db._ensure_current_schema") as ensure_mock:
+            init_db()
+        ensure_mock.assert_called_once()
+
+
+class TestConnectionReuse:
+    """Тесты переиспользования соединения с БД."""
+
+    def test_connection_reused_between_calls(self, temp_db):
+        """Повторные вызовы _connect используют одно соединение."""
+        init_db()
+        with _connect() as first:
+            pass
+        with _connect() as second:
+            pass
+        assert first is second
+
+    def test_file_connection_uses_mmap(self, temp_db):
+        """Соединение с файловой БД включает memory-mapped I/O."""
+        init_db()
+        with _connect() as conn:
+            assert conn.execute("PRAGMA mmap_size").fetchone()[0] == db._MMAP_SIZE
+
+    def test_uncommitted_changes_rolled_back_on_exit(self, temp_db):
+        """Незафиксированные изменения откатываются при выходе из _connect."""
+        init_db()
+        with _connect() as conn:
+            conn.execute(
+                "INSERT INTO players (id, name, fullname) VALUES (1, 'u', 'U')"
+            )
+
+        with _connect() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM players").fetchone()[0] == 0
+
+    def test_reconnects_after_db_path_change(self, temp_db, tmp_path, monkeypatch):
+        """Смена VOLLEYBOT_DB_PATH открывает новое соединение."""
+        init_db()
+        with _connect() as first:
+            pass
+
+        monkeypatch.setenv("VOLLEYBOT_DB_PATH", str(tmp_path / "other.db"))
+        with _connect() as second:
+            pass
+        assert first is not second
+
+    def test_close_db_closes_connection(self, temp_db):
+        """close_db закрывает соединение, следующий вызов открывает новое."""
+        init_db()
+        with _connect() as first:
+            pass
+        close_db()
+        with _connect() as second:
+            assert second.execute("SELECT 1").fetchone() == (1,)
+        assert first is not second
+
+    def test_reconnects_when_db_file_replaced(self, temp_db, tmp_path):
+        """Замена файла БД (как при db-push) открывает новое соединение."""
+        init_db()
+        replacement = create_backup("empty")
+        assert replacement is not None
+        ensure_player(user_id=1, name="old", fullname="Old")
+
+        db_path = os.environ["VOLLEYBOT_DB_PATH"]
+        os.replace(db_path, str(tmp_path / "old.db"))
+        for suffix in ("-wal", "-shm"):
+            Path(db_path + suffix).unlink(missing_ok=True)
+        os.replace(str(replacement), db_path)
+
+        assert get_player_info(1) is None
+        ensure_player(user_id=2, name="new", fullname="New")
+        check = sqlite3.connect(db_path)
+        try:
+            ids = [row[0] for row in check.execute("SELECT id FROM players")]
+        finally:
+            check.close()
+        assert ids == [2]
+
+
+class TestKVStore:
+    """Тесты хранения JSON-состояния в kv_store."""
+
+    def test_save_state_stores_utf8_blob(self, temp_db):
+        """Состояние пишется как UTF-8 BLOB и читается обратно."""
+        save_state("test_key", {"name": "Пятница", "ids": [1, 2]})
+
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT typeof(value) FROM kv_store WHERE key = ?", ("test_key",)
+            ).fetchone()
+        assert row[0] == "blob"
+        assert load_state("test_key") == {"name": "Пятница", "ids": [1, 2]}
+
+    def test_save_state_refreshes_updated_at(self, temp_db):
+        """Перезапись ключа обновляет updated_at через DEFAULT столбца."""
+        save_state("test_key", 1)
+        with _connect() as conn:
+            conn.execute(
+                "UPDATE kv_store SET updated_at = '2000-01-01 00:00:00' WHERE key = ?",
+                ("test_key",),
+            )
+            conn.commit()
+
+        save_state("test_key", 2)
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT updated_at FROM kv_store WHERE key = ?", ("test_key",)
+            ).fetchone()
+        assert row[0] != "2000-01-01 00:00:00"
+
+    def test_load_state_returns_integer_fund_balance(self, temp_db):
+        """Целочисленное значение кассы читается без JSON."""
+        update_fund_balance(300)
+        update_fund_balance(-50)
+
+        assert load_state(db.FUND_BALANCE_KEY) == 250
+        assert get_fund_balance() == 250
+
+    def test_load_state_reads_legacy_text_value(self, temp_db):
+        """Старые TEXT-записи продолжают читаться."""
+        init_db()
+        with _connect() as conn:
+            conn.execute(
+                "INSERT INTO kv_store(key, value) VALUES (?, ?)",
+                ("legacy", '{"a": "б"}'),
+            )
+            conn.commit()
+
+        assert load_state("legacy") == {"a": "б"}
+
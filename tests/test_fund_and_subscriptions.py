@@ -15,6 +15,7 @@ from aiogram.types import (
 from src.db import (
     _connect,
     add_transaction,
+    charge_player_atomic,
     ensure_player,
     get_fund_balance,
     get_player_balance,
@@ -23,6 +24,8 @@ from src.db import (
     record_hall_payment,
     save_poll_template,
     update_fund_balance,
+    update_player_and_fund_balance_atomic,
+    update_player_and_transaction_atomic,
     update_player_balance,
 )
 from src.handlers import register_handlers
@@ -251,6 +254,52 @@ class TestTransactionLogging:
             assert row["poll_name_snapshot"] == "Пятница"
             assert row["amount"] == -150
 
+    def test_charge_player_atomic_registers_charges_and_logs(self, temp_db):
+        """Новый игрок создаётся, списывается и получает транзакцию за один вызов."""
+        init_db()
+        player = charge_player_atomic(102, 150, "Зал: Пятница", name="new_user")
+
+        assert player == {
+            "id": 102,
+            "name": "new_user",
+            "fullname": None,
+            "balance": -150,
+        }
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT amount, description FROM transactions WHERE player_id = 102"
+            ).fetchone()
+        assert row == (-150, "Зал: Пятница")
+
+    def test_charge_player_atomic_rolls_back_on_error(self, temp_db):
+        """Ошибка записи транзакции откатывает и списание, и регистрацию."""
+        init_db()
+        player = charge_player_atomic(103, 150, "Зал", poll_template_id=99999)
+
+        assert player is None
+        assert get_player_balance(103) is None
+        with _connect() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+
+    def test_atomic_balance_updates_return_player_row(self, temp_db):
+        """Атомарные /pay и /restore возвращают строку игрока после изменения."""
+        init_db()
+        ensure_player(user_id=104, name="payer", fullname="Payer")
+
+        paid = update_player_and_fund_balance_atomic(104, 300, "Оплата")
+        restored = update_player_and_transaction_atomic(104, -100, "Восстановление")
+
+        assert paid == {"id": 104, "name": "payer", "fullname": "Payer", "balance": 300}
+        assert restored == {
+            "id": 104,
+            "name": "payer",
+            "fullname": "Payer",
+            "balance": 200,
+        }
+        assert get_fund_balance() == 300
+        assert update_player_and_fund_balance_atomic(999, 100, "Нет игрока") is None
+        assert get_fund_balance() == 300
+
 
 # ── Handler-level /pay tests (fund tracking) ────────────────────────────────
 
@@ -260,7 +309,7 @@ class TestPayFundTracking:
     """/pay должен обновлять кассу и создавать транзакцию."""
 
     @patch("src.handlers.get_fund_balance", return_value=0)
-    @patch("src.handlers.update_player_and_transaction_atomic", return_value=True)
+    @patch("src.handlers.update_player_and_transaction_atomic")
     @patch("src.handlers.get_player_balance")
     @patch("src.handlers.ensure_player")
     async def test_restore_does_not_update_fund(
@@ -277,11 +326,11 @@ class TestPayFundTracking:
         bot = AsyncMock(spec=Bot)
         dp = Dispatcher()
 
-        mock_get_balance.return_value = {
+        mock_update_balance.return_value = {
             "id": regular_user.id,
             "name": "regular_user",
             "fullname": "Regular User",
-            "balance": 0,
+            "balance": 150,
         }
 
         dp.workflow_data.update(
@@ -319,9 +368,10 @@ class TestPayFundTracking:
         assert call_args[0][0] == regular_user.id
         assert call_args[0][1] == 150
         mock_get_fund.assert_not_called()
+        mock_get_balance.assert_not_called()
 
     @patch("src.handlers.get_fund_balance", return_value=0)
-    @patch("src.handlers.update_player_and_transaction_atomic", return_value=True)
+    @patch("src.handlers.update_player_and_transaction_atomic")
     @patch("src.handlers.get_player_balance")
     @patch("src.handlers.ensure_player")
     async def test_restore_shows_no_fund_change(
@@ -338,7 +388,7 @@ class TestPayFundTracking:
         bot = AsyncMock(spec=Bot)
         dp = Dispatcher()
 
-        mock_get_balance.return_value = {
+        mock_update_balance.return_value = {
             "id": regular_user.id,
             "name": "regular_user",
             "fullname": "Regular User",
@@ -1,7 +1,8 @@
 """Тесты для обработчиков команд."""
 
+import logging
 from datetime import datetime
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 
 import pytest
 from aiogram import Bot, Dispatcher
@@ -17,7 +18,15 @@ from src.db import (
     save_poll_template,
     set_player_guest,
 )
-from src.handlers import register_handlers
+from src.handlers import (
+    BOT_ADMIN_COMMANDS,
+    BOT_USER_COMMANDS,
+    MESSAGE_CHUNK_LIMIT,
+    _callback_prefix,
+    _split_message_lines,
+    register_handlers,
+    setup_bot_commands,
+)
 from src.poll import PollData
 from src.services import BotStateService, PollService
 
@@ -206,9 +215,40 @@ class TestScheduleCommand:
         text = method.text
 
         assert text is not None
-        assert "📅 <b>Расписание игр</b> (время МСК)" in text
-        assert "Вторник 18:30 (Test Place)" in text
-        assert "ℹ️ Опрос начинается за день до игры в 19:00" in text
+        assert text == (
+            "📅 <b>Расписание игр</b> (время МСК)\n\n"
+            "Вторник 18:30 (Test Place)\n\n"
+            "<i>ℹ️ Опрос начинается за день до игры в 19:00 "
+            "и заканчивается за полчаса до начала игры.</i>"
+        )
+        # Расписание не привязано к сообщению с командой
+        assert method.reply_parameters is None
+
+
+class TestCallbackPrefix:
+    """Тесты выделения префикса callback data."""
+
+    def test_prefix_before_first_colon(self):
+        """Префикс берётся до первого двоеточия."""
+        assert _callback_prefix("pay_select:12:-500") == "pay_select"
+
+    def test_data_without_colon_has_no_prefix(self):
+        """Без двоеточия и для пустых данных префикса нет."""
+        assert _callback_prefix("hall_save") == ""
+        assert _callback_prefix(None) == ""
+
+
+class TestSplitMessageLines:
+    """Тесты разбиения длинного ответа на сообщения."""
+
+    def test_short_text_stays_single_message(self):
+        """Короткий список строк склеивается в одно сообщение."""
+        assert _split_message_lines(["a", "b", "c"]) == ["a\nb\nc"]
+
+    def test_splits_only_between_lines(self):
+        """Куски не превышают лимит и не разрывают строки."""
+        lines = ["x" * 4, "y" * 4, "z" * 4]
+        assert _split_message_lines(lines, limit=9) == ["xxxx\nyyyy", "zzzz"]
 
 
 @pytest.mark.asyncio
@@ -394,6 +434,54 @@ class TestSubsCommand:
         text = method.text or ""
         assert "⏸️ выключен" in text
 
+    @patch("src.handlers.get_poll_templates")
+    @patch("src.handlers.get_all_players")
+    async def test_subs_command_splits_long_reply(
+        self, mock_get_players, mock_get_templates, admin_user, admin_service
+    ):
+        """Длинный /subs отправляется несколькими сообщениями в пределах лимита."""
+        bot = AsyncMock(spec=Bot)
+        dp = Dispatcher()
+
+        mock_get_templates.return_value = [
+            {
+                "name": f"Poll {i} " + "x" * 150,
+                "game_day": "mon",
+                "subs": [],
+            }
+            for i in range(60)
+        ]
+        mock_get_players.return_value = []
+
+        dp.workflow_data.update(
+            {
+                "admin_service": admin_service,
+                "bot_state_service": MagicMock(spec=BotStateService),
+                "poll_service": MagicMock(spec=PollService),
+                "scheduler": MagicMock(),
+            }
+        )
+
+        register_handlers(dp, bot)
+
+        chat = Chat(id=-1001234567890, type="supergroup")
+        message = Message(
+            message_id=5,
+            date=MagicMock(),
+            chat=chat,
+            from_user=admin_user,
+            text="/subs",
+        )
+
+        await dp.feed_update(bot, Update(update_id=5, message=message))
+
+        texts = [call.args[0].text for call in bot.call_args_list]
+        assert len(texts) > 1
+        assert all(len(text) <= MESSAGE_CHUNK_LIMIT for text in texts)
+        assert texts[0].startswith("📅 <b>Абонементы по дням</b>")
+        joined = "\n".join(texts)
+        assert all(f"Poll {i} " in joined for i in range(60))
+
     @patch("src.handlers.create_backup")
     async def test_subs_add_by_username_adds_subscription(
         self, mock_create_backup, admin_user, regular_user, admin_service
@@ -1333,6 +1421,55 @@ class TestHallCommands:
         assert "⏸️ выключен" in (method.text or "")
 
 
+@pytest.mark.asyncio
+class TestLogAnyMessage:
+    """Тесты catch-all логирования сообщений."""
+
+    async def _feed_plain_message(self, regular_user, admin_service) -> None:
+        bot = AsyncMock(spec=Bot)
+        dp = Dispatcher()
+        dp.workflow_data.update(
+            {
+                "admin_service": admin_service,
+                "bot_state_service": MagicMock(spec=BotStateService),
+            }
+        )
+        register_handlers(dp, bot)
+        message = Message(
+            message_id=10,
+            date=datetime.now(),
+            chat=Chat(id=-1001234567890, type="supergroup"),
+            from_user=regular_user,
+            text="привет",
+        )
+        await dp.feed_update(bot, Update(update_id=10, message=message))
+
+    async def test_logs_message_at_debug(self, regular_user, admin_service, caplog):
+        """При уровне DEBUG сообщение попадает в лог."""
+        caplog.set_level(logging.DEBUG)
+        await self._feed_plain_message(regular_user, admin_service)
+        assert "📨 Сообщение: id=10" in caplog.text
+        assert "от=@regular_user" in caplog.text
+
+    async def test_skips_formatting_above_debug(
+        self, regular_user, admin_service, caplog
+    ):
+        """Без DEBUG обработчик не вычисляет поля сообщения для лога."""
+        caplog.set_level(logging.INFO)
+        with patch.object(
+            Message, "content_type", new_callable=PropertyMock, return_value="text"
+        ) as content_type:
+            await self._feed_plain_message(regular_user, admin_service)
+        content_type.assert_not_called()
+
+        caplog.set_level(logging.DEBUG)
+        with patch.object(
+            Message, "content_type", new_callable=PropertyMock, return_value="text"
+        ) as content_type:
+            await self._feed_plain_message(regular_user, admin_service)
+        content_type.assert_called()
+
+
 @pytest.mark.asyncio
 class TestChatIdCommand:
     """Тесты для команды /chatid."""
@@ -1881,3 +2018,108 @@ class TestRefreshAdminsCommand:
 
         # Проверяем, что у администратора есть доступ
         assert admin_user.id in admin_service._admin_cache[-1001234567890]
+
+
+@pytest.mark.asyncio
+class TestChatMemberHandler:
+    """Тесты сброса кэша администраторов по обновлениям chat_member."""
+
+    @staticmethod
+    def _chat_member_update(user, old_status: str, new_status: str) -> Update:
+        admin_rights = {
+            "can_be_edited": False,
+            "is_anonymous": False,
+            "can_manage_chat": True,
+            "can_delete_messages": True,
+            "can_manage_video_chats": True,
+            "can_restrict_members": True,
+            "can_promote_members": False,
+            "can_change_info": True,
+            "can_invite_users": True,
+            "can_post_stories": False,
+            "can_edit_stories": False,
+            "can_delete_stories": False,
+        }
+
+        def member(status: str) -> dict:
+            data = {"status": status, "user": user}
+            if status == "administrator":
+                data.update(admin_rights)
+            return data
+
+        return Update.model_validate(
+            {
+                "update_id": 1,
+                "chat_member": {
+                    "chat": {"id": -1001234567890, "type": "supergroup"},
+                    "from": user,
+                    "date": datetime.now(),
+                    "old_chat_member": member(old_status),
+                    "new_chat_member": member(new_status),
+                },
+            }
+        )
+
+    async def test_promotion_invalidates_admin_cache(
+        self, regular_user, admin_service
+    ):
+        """Назначение администратора сбрасывает кэш чата."""
+        bot = MagicMock(spec=Bot)
+        dp = Dispatcher()
+        dp.workflow_data.update(
+            {
+                "admin_service": admin_service,
+                "bot_state_service": MagicMock(spec=BotStateService),
+            }
+        )
+        register_handlers(dp, bot)
+
+        await dp.feed_update(
+            bot, self._chat_member_update(regular_user, "member", "administrator")
+        )
+
+        assert -1001234567890 not in admin_service._admin_cache
+
+    async def test_regular_member_change_keeps_admin_cache(
+        self, admin_user, regular_user, admin_service
+    ):
+        """Изменения без смены админских прав кэш не трогают."""
+        bot = MagicMock(spec=Bot)
+        dp = Dispatcher()
+        dp.workflow_data.update(
+            {
+                "admin_service": admin_service,
+                "bot_state_service": MagicMock(spec=BotStateService),
+            }
+        )
+        register_handlers(dp, bot)
+
+        await dp.feed_update(
+            bot, self._chat_member_update(regular_user, "member", "left")
+        )
+
+        assert admin_service.get_cached_admins() == {admin_user.id}
+
+
+@pytest.mark.asyncio
+class TestSetupBotCommands:
+    """Тесты регистрации меню команд."""
+
+    async def test_sets_commands_for_all_scopes(self):
+        """Меню задаётся для лички, групп и администраторов."""
+        bot = MagicMock(spec=Bot)
+        bot.set_my_commands = AsyncMock(return_value=True)
+
+        await setup_bot_commands(bot)
+
+        calls = bot.set_my_commands.await_args_list
+        assert len(calls) == 3
+        scopes = {
+            type(call.kwargs.get("scope")).__name__: call.kwargs["commands"]
+            for call in calls
+        }
+        assert scopes == {
+            "NoneType": BOT_USER_COMMANDS,
+            "BotCommandScopeAllGroupChats": BOT_USER_COMMANDS,
+            "BotCommandScopeAllChatAdministrators": BOT_ADMIN_COMMANDS,
+        }
@@ -1,5 +1,6 @@
 """Тесты для модуля poll и PollService."""
 
+import asyncio
 import json
 from datetime import datetime
 from typing import Any
@@ -33,6 +34,7 @@ from src.poll import (
     sort_voters_by_update_id,
 )
 from src.services import PollService
+from src.services.poll_service import POLL_STATE_PERSIST_DELAY_SECONDS
 from src.types import PollCreationSpec, SubscriptionResult
 
 
@@ -593,14 +595,16 @@ class TestSendPollSpec:
         mock_bot.send_poll = AsyncMock(side_effect=migration_error)
         mock_bot.send_message = AsyncMock()
 
-        result = await service.send_poll_spec(
-            mock_bot,
-            chat_id=-1001234567890,
-            spec=self._regular_spec(),
-            bot_enabled=True,
-        )
+        with patch("src.services.poll_service.save_error_dump") as mock_save:
+            result = await service.send_poll_spec(
+                mock_bot,
+                chat_id=-1001234567890,
+                spec=self._regular_spec(),
+                bot_enabled=True,
+            )
 
         assert result == new_chat_id
+        mock_save.assert_called_once()
         mock_bot.send_message.assert_called_once()
 
     async def test_send_poll_spec_handles_general_error(self, mock_bot, temp_db):
@@ -1096,8 +1100,8 @@ class TestProcessPaymentDeduction:
         assert charged == []
         assert any("@sub_user" in name for name in subscribed_names)
 
-    async def test_handles_none_from_get_player_balance(self, mock_bot, temp_db):
-        """Если get_player_balance возвращает None — используется 0, исключения нет."""
+    async def test_new_player_charged_from_zero_balance(self, mock_bot, temp_db):
+        """Новый игрок списывается с нулевого баланса."""
         init_db()
         save_poll_template(
             {
@@ -1108,19 +1112,47 @@ class TestProcessPaymentDeduction:
         )
         service = PollService()
         roster = _build_roster([VoterInfo(id=99, name="@new_user")])
-        with patch("src.services.poll_service.get_player_balance", return_value=None):
-            with patch.object(
-                service, "_send_admin_report", new_callable=AsyncMock
-            ) as mock_report:
-                await service._process_payment_deduction(
-                    mock_bot, "Зал для теста None", roster
-                )
+        with patch.object(
+            service, "_send_admin_report", new_callable=AsyncMock
+        ) as mock_report:
+            await service._process_payment_deduction(
+                mock_bot, "Зал для теста None", roster
+            )
         mock_report.assert_called_once()
         _, _, _, charged, _ = mock_report.call_args[0]
         assert len(charged) == 1
         assert charged[0]["old_balance"] == 0
         assert charged[0]["new_balance"] == -50
 
+    async def test_failed_balance_update_is_not_reported_as_charge(
+        self, mock_bot, temp_db
+    ):
+        """Неудачное списание не попадает в отчёт и не создаёт транзакцию."""
+        init_db()
+        save_poll_template(
+            {
+                "name": "Зал со сбоем",
+                "message": "Текст",
+                "cost": 50,
+            }
+        )
+        service = PollService()
+        roster = _build_roster([VoterInfo(id=98, name="@broken")])
+        with (
+            patch("src.services.poll_service.charge_player_atomic", return_value=None),
+            patch.object(
+                service, "_send_admin_report", new_callable=AsyncMock
+            ) as mock_report,
+        ):
+            participants = await service._process_payment_deduction(
+                mock_bot, "Зал со сбоем", roster
+            )
+        with _connect() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+        mock_report.assert_not_called()
+        assert participants[0]["charge_source"] == "none"
+        assert participants[0]["charged_amount"] == 0
+
     async def test_skips_booked_players_without_charge(self, mock_bot, temp_db):
         """Игроки в листе ожидания не должны списываться автоматически."""
         init_db()
@@ -1367,6 +1399,40 @@ def test_persist_poll_state_roundtrip():
     assert yes_voters[0].name == "@user7"
 
 
+@pytest.mark.asyncio
+async def test_scheduled_persist_coalesces_writes():
+    """Серия отложенных сохранений пишет в БД один раз и последнюю версию."""
+    init_db()
+    service = PollService()
+    service._poll_data["poll123"] = PollData(chat_id=1, poll_msg_id=2)
+
+    with patch("src.services.poll_service.save_state", wraps=save_state) as save_mock:
+        service.schedule_persist_state()
+        service._poll_data["poll123"].info_msg_id = 3
+        service.schedule_persist_state()
+        assert save_mock.call_count == 0
+
+        await asyncio.sleep(POLL_STATE_PERSIST_DELAY_SECONDS + 0.1)
+        assert save_mock.call_count == 1
+
+    stored = load_state(POLL_STATE_KEY, default={})
+    assert stored["poll123"]["info_msg_id"] == 3
+
+
+@pytest.mark.asyncio
+async def test_persist_state_flushes_scheduled_write():
+    """Немедленное сохранение отменяет отложенное (как при остановке бота)."""
+    init_db()
+    service = PollService()
+    service._poll_data["poll123"] = PollData(chat_id=1, poll_msg_id=2)
+
+    with patch("src.services.poll_service.save_state", wraps=save_state) as save_mock:
+        service.schedule_persist_state()
+        service.persist_state()
+        await asyncio.sleep(POLL_STATE_PERSIST_DELAY_SECONDS + 0.1)
+        assert save_mock.call_count == 1
+
+
 def test_load_persisted_state_prefers_db_subs_for_regular_games():
     """При восстановлении regular poll должен брать актуальные subs из БД."""
     init_db()
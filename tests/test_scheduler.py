@@ -176,7 +176,8 @@ class TestSetupScheduler:
 
             # Проверяем, что задачи добавлены
             jobs = scheduler.get_jobs()
-            assert len(jobs) == 3  # Открытие, закрытие и очистка старых бэкапов
+            # Открытие, закрытие, очистка старых бэкапов и PRAGMA optimize
+            assert len(jobs) == 4
 
     def test_setup_scheduler_skips_disabled_templates(self, temp_db):
         """Планировщик не должен создавать jobs для выключенных шаблонов."""
@@ -215,13 +216,14 @@ class TestSetupScheduler:
             setup_scheduler(scheduler, bot, bot_state_service, poll_service)
 
         jobs = scheduler.get_jobs()
-        assert len(jobs) == 3
+        assert len(jobs) == 4
         job_names = {job.name for job in jobs}
         assert "enabled_poll (открытие)" in job_names
         assert "enabled_poll (закрытие)" in job_names
         assert "disabled_poll (открытие)" not in job_names
         assert "disabled_poll (закрытие)" not in job_names
         assert "Бэкапы (очистка)" in job_names
+        assert "БД (PRAGMA optimize)" in job_names
 
     def test_setup_scheduler_with_empty_db(self, temp_db):
         """Тест настройки планировщика при отсутствии опросов в БД."""
@@ -235,8 +237,10 @@ class TestSetupScheduler:
             setup_scheduler(scheduler, bot, bot_state_service, poll_service)
 
             jobs = scheduler.get_jobs()
-            assert len(jobs) == 1
-            assert jobs[0].name == "Бэкапы (очистка)"
+            assert {job.name for job in jobs} == {
+                "Бэкапы (очистка)",
+                "БД (PRAGMA optimize)",
+            }
 
     def test_setup_scheduler_restores_active_monthly_jobs_before_reminder(
         self, monkeypatch: pytest.MonkeyPatch, temp_db
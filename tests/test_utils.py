@@ -1,17 +1,20 @@
 """Тесты для модуля utils."""
 
+import asyncio
 import json
 import time
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import User
 
 from src.services import AdminService
 from src.utils import (
     _RATE_LIMIT_CACHE,
     RATE_LIMIT_MAX_REQUESTS,
+    RATE_LIMIT_WINDOW,
     escape_html,
     format_player_link,
     generate_webhook_secret_path,
@@ -19,6 +22,7 @@ from src.utils import (
     is_rate_limited,
     is_telegram_ip,
     rate_limit_check,
+    retry_async,
     save_error_dump,
     validate_balance_callback_data,
     validate_hall_pay_callback_data,
@@ -91,6 +95,29 @@ class TestAdminService:
         await admin_service.is_admin(mock_bot, admin_user)
         assert mock_bot.get_chat_administrators.call_count == 1  # Не увеличился
 
+    @pytest.mark.asyncio
+    async def test_concurrent_is_admin_fetches_admins_once(
+        self, admin_service, mock_bot, admin_user, regular_user
+    ):
+        """Одновременные проверки при пустом кэше делают один запрос к API."""
+        admin_member = MagicMock()
+        admin_member.user = admin_user
+
+        async def slow_fetch(chat_id):
+            await asyncio.sleep(0)
+            return [admin_member]
+
+        mock_bot.get_chat_administrators = AsyncMock(side_effect=slow_fetch)
+
+        results = await asyncio.gather(
+            admin_service.is_admin(mock_bot, admin_user),
+            admin_service.is_admin(mock_bot, regular_user),
+            admin_service.is_admin(mock_bot, admin_user),
+        )
+
+        assert results == [True, False, True]
+        assert mock_bot.get_chat_administrators.call_count == 1
+
     @pytest.mark.asyncio
     async def test_refresh_cache_updates_admins(
         self, admin_service, mock_bot, admin_user
@@ -216,6 +243,22 @@ class TestRateLimiting:
         # Следующий запрос должен быть заблокирован
         assert is_rate_limited(user_id) is True
 
+    def test_is_rate_limited_caps_any_window(self):
+        """Тест что в любом окне принимается не больше лимита запросов."""
+        user_id = 12347
+        step = 0.1
+        accepted: list[float] = []
+        for i in range(int(2 * RATE_LIMIT_WINDOW / step)):
+            now = 1000.0 + i * step
+            with patch("src.utils.time.monotonic", return_value=now):
+                if not is_rate_limited(user_id):
+                    accepted.append(now)
+
+        assert len(accepted) == 2 * RATE_LIMIT_MAX_REQUESTS
+        for start in accepted:
+            in_window = [t for t in accepted if start <= t < start + RATE_LIMIT_WINDOW]
+            assert len(in_window) <= RATE_LIMIT_MAX_REQUESTS
+
     def test_rate_limit_check_returns_none_for_admin(self):
         """Тест что администраторы не ограничены rate limit."""
         admin_user = User(id=777, is_bot=False, first_name="Admin", username="admin")
@@ -237,6 +280,27 @@ class TestRateLimiting:
         assert "Слишком много запросов" in result
 
 
+class TestRetryAsync:
+    """Тесты декоратора retry_async."""
+
+    @pytest.mark.asyncio
+    async def test_waits_retry_after_on_flood_control(self):
+        """TelegramRetryAfter ждёт указанное Telegram время, а не базовую паузу."""
+        flood = TelegramRetryAfter(
+            method=MagicMock(), message="Flood control exceeded", retry_after=7
+        )
+        operation = AsyncMock(side_effect=[flood, "ok"])
+
+        @retry_async(TelegramRetryAfter, tries=2, delay=1)
+        async def send():
+            return await operation()
+
+        with patch("src.utils.asyncio.sleep", new=AsyncMock()) as sleep_mock:
+            assert await send() == "ok"
+
+        sleep_mock.assert_awaited_once_with(7)
+
+
 class TestTelegramIPValidation:
     """Тесты для валидации IP-адресов Telegram."""
 
@@ -724,6 +788,13 @@ class TestCallbackValidation:
         """Некорректный формат данных должен отвергаться."""
         assert validate_balance_callback_data("pay_select:abc:500", "pay_select") is None
         assert validate_balance_callback_data("pay_select:123", "pay_select") is None
+        assert (
+            validate_balance_callback_data("pay_select:123:500:1", "pay_select") is None
+        )
+        assert (
+            validate_player_select_callback_data("player_select:1:2", "player_select")
+            is None
+        )
 
     def test_hall_pay_callback_accepts_valid_data(self):
         """Валидные данные hall_pay должны приниматься."""